@@ -1,7 +1,38 @@
 # TODO: Get rid of all flake8 warnings -- that means adding docstrings
 #      to the file, classes, and methods.
 
+import bisect
+import marshal
+import math
+import mmap
+import multiprocessing
+import os
+import random
+import struct
+import sys
+import threading
+from timeit import default_timer as clock
+try:
+    import numpy
+except ImportError:
+    numpy = None
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+
 DELETED = (-1, -1)
+_MISSING = object()
+
+
+def print_event(event, item):
+    """
+    An on_event hook that reports every mutation on stdout.
+
+    >>> print_event("insert", (5, "five"))
+    (5, 'five') inserted
+    """
+    print str(item) + " " + event.rstrip("e") + "ed"
 
 
 class SinglyLinkedNode(object):
@@ -49,13 +80,48 @@ class SinglyLinkedNode(object):
         return repr(self.item)
 
 
+class CompactSinglyLinkedNode(object):
+    __slots__ = ('item', 'next')
+
+    def __init__(self, item=None, next_link=None):
+        """
+        >>> node2 = CompactSinglyLinkedNode((5,"five"), None)
+        >>> node = CompactSinglyLinkedNode((4,"four"), node2)
+        >>> node.next
+        (5, 'five')
+        >>> hasattr(node, '__dict__')
+        False
+        """
+        self.item = item
+        self.next = next_link
+
+    def __repr__(self):
+        """
+        >>> node = CompactSinglyLinkedNode((4,"four"), None)
+        >>> node.__repr__()
+        "(4, 'four')"
+        """
+        return repr(self.item)
+
+
 class SinglyLinkedList(object):
-    def __init__(self):
+    def __init__(self, compact=False, on_event=None):
         """
         >>> l_list = SinglyLinkedList()
+        >>> compact_list = SinglyLinkedList(compact=True)
+        >>> verbose_list = SinglyLinkedList(on_event=print_event)
+        >>> verbose_list.prepend(4)
+        4 inserted
+        >>> verbose_list.remove(4)
+        4 deleted
+        1
         """
         super(SinglyLinkedList, self).__init__()
+        self.__node_class = CompactSinglyLinkedNode if compact else SinglyLinkedNode
+        self.__on_event = on_event
         self.head = None
+        self.tail = None
+        self.__length = 0
 
     def __len__(self):
         """
@@ -63,7 +129,6 @@ class SinglyLinkedList(object):
         >>> l_list.__len__()
         0
         >>> l_list.prepend(4)
-        '4 inserted'
         >>> l_list.__len__()
         1
         >>> l_list.remove(4)
@@ -71,18 +136,12 @@ class SinglyLinkedList(object):
         >>> l_list.__len__()
         0
         """
-        node = self.head
-        length = 0
-        while node is not None:
-            length += 1
-            node = node.next
-        return length
+        return self.__length
 
     def __iter__(self):
         """
         >>> l_list = SinglyLinkedList()
         >>> l_list.prepend(4)
-        '4 inserted'
         >>> for item in l_list.__iter__(): print item
         4
         """
@@ -95,7 +154,6 @@ class SinglyLinkedList(object):
         """
         >>> l_list = SinglyLinkedList()
         >>> l_list.prepend(4)
-        '4 inserted'
         >>> l_list.__contains__(4)
         True
         >>> l_list.__contains__(10)
@@ -115,52 +173,148 @@ class SinglyLinkedList(object):
         """
         >>> l_list = SinglyLinkedList()
         >>> l_list.prepend(4)
-        '4 inserted'
         >>> l_list.remove(4)
         1
         >>> l_list.remove(10)
         0
         """
+        previous = None
         node = self.head
-        if node is None:
-            return 0
-        elif node.item == item:
-            self.head = node.next
-            node.item = None
-            node.next = None
-            return 1
-        else:
-            while node.next is not None:
-                if node.next.item == item:
-                    break
-                node = node.next
-            if node.next is not None:
-                temp = node.next
-                node.next = temp.next
-                temp.item = None
-                temp.next = None
+        while node is not None:
+            if node.item == item:
+                self.remove_after(previous)
                 return 1
+            previous = node
+            node = node.next
         return 0
 
+    def remove_after(self, previous):
+        """
+        >>> l_list = SinglyLinkedList()
+        >>> for i in range(3): l_list.append(i)
+        >>> l_list.remove_after(l_list.head.next)
+        2
+        >>> l_list.remove_after(None)
+        0
+        >>> l_list.__repr__(), l_list.tail
+        ('List:1', 1)
+        """
+        if previous is None:
+            node = self.head
+            self.head = node.next
+        else:
+            node = previous.next
+            previous.next = node.next
+        if node is self.tail:
+            self.tail = previous
+        item = node.item
+        node.item = None
+        node.next = None
+        self.__length -= 1
+        if self.__on_event is not None:
+            self.__on_event("delete", item)
+        return item
+
     def prepend(self, item):
         """
         >>> l_list = SinglyLinkedList()
         >>> l_list.prepend(4)
-        '4 inserted'
         """
-        node = SinglyLinkedNode(item)
+        node = self.__node_class(item)
         if self.head is not None:
             node.next = self.head
+        else:
+            self.tail = node
+        self.head = node
+        self.__length += 1
+        if self.__on_event is not None:
+            self.__on_event("insert", item)
+
+    def append(self, item):
+        """
+        >>> l_list = SinglyLinkedList()
+        >>> l_list.append(4)
+        >>> l_list.append(5)
+        >>> l_list.__repr__()
+        'List:4->5'
+        """
+        node = self.__node_class(item)
+        if self.tail is not None:
+            self.tail.next = node
+        else:
+            self.head = node
+        self.tail = node
+        self.__length += 1
+        if self.__on_event is not None:
+            self.__on_event("insert", item)
+
+    def popleft(self):
+        """
+        >>> l_list = SinglyLinkedList()
+        >>> l_list.append(4)
+        >>> l_list.append(5)
+        >>> l_list.popleft()
+        4
+        >>> l_list.popleft()
+        5
+        >>> l_list.popleft()
+        Traceback (most recent call last):
+        ...
+        IndexError: popleft from an empty list
+        """
+        if self.head is None:
+            raise IndexError("popleft from an empty list")
+        return self.remove_after(None)
+
+    def popleft_node(self):
+        """
+        Detach and return the head node itself, keeping its item, so it can
+        be relinked into another list with prepend_node().
+
+        >>> l_list = SinglyLinkedList()
+        >>> for i in range(2): l_list.append(i)
+        >>> other = SinglyLinkedList()
+        >>> other.prepend_node(l_list.popleft_node())
+        >>> l_list.__repr__(), other.__repr__(), other.tail.item
+        ('List:1', 'List:0', 0)
+        >>> SinglyLinkedList().popleft_node()
+        Traceback (most recent call last):
+        ...
+        IndexError: popleft from an empty list
+        """
+        if self.head is None:
+            raise IndexError("popleft from an empty list")
+        node = self.head
+        self.head = node.next
+        if node is self.tail:
+            self.tail = None
+        node.next = None
+        self.__length -= 1
+        if self.__on_event is not None:
+            self.__on_event("delete", node.item)
+        return node
+
+    def prepend_node(self, node):
+        """
+        >>> l_list = SinglyLinkedList()
+        >>> l_list.prepend_node(SinglyLinkedNode(4))
+        >>> l_list.prepend_node(SinglyLinkedNode(5))
+        >>> l_list.__repr__(), l_list.__len__(), l_list.tail.item
+        ('List:5->4', 2, 4)
+        """
+        node.next = self.head
+        if self.head is None:
+            self.tail = node
         self.head = node
-        return str(item) + " inserted"
+        self.__length += 1
+        if self.__on_event is not None:
+            self.__on_event("insert", node.item)
 
     def __repr__(self):
         """
         >>> l_list = SinglyLinkedList()
         >>> l_list.prepend(4)
-        '4 inserted'
         >>> l_list. prepend(5)
-        '5 inserted'
         >>> l_list.__repr__()
         'List:5->4'
         """
@@ -168,24 +322,507 @@ class SinglyLinkedList(object):
         return s
 
 
+class DoublyLinkedNode(SinglyLinkedNode):
+    def __init__(self, item=None, next_link=None, prev_link=None):
+        """
+        >>> node2 = DoublyLinkedNode((5,"five"))
+        >>> node = DoublyLinkedNode((4,"four"), node2)
+        >>> node2.prev = node
+        >>> node2.prev, node.next
+        ((4, 'four'), (5, 'five'))
+        """
+        super(DoublyLinkedNode, self).__init__(item, next_link)
+        self._prev = prev_link
+
+    @property
+    def prev(self):
+        return self._prev
+
+    @prev.setter
+    def prev(self, prev):
+        self._prev = prev
+
+
+class CompactDoublyLinkedNode(CompactSinglyLinkedNode):
+    __slots__ = ('prev',)
+
+    def __init__(self, item=None, next_link=None, prev_link=None):
+        """
+        >>> node = CompactDoublyLinkedNode((4,"four"))
+        >>> node.prev, hasattr(node, '__dict__')
+        (None, False)
+        """
+        super(CompactDoublyLinkedNode, self).__init__(item, next_link)
+        self.prev = prev_link
+
+
+class DoublyLinkedList(object):
+    def __init__(self, compact=False, on_event=None):
+        """
+        Doubly-linked list with O(1) push and pop at both ends and O(1)
+        unlink of a node the caller already holds. The *_node methods take
+        and return nodes so other structures can keep handles into the list.
+
+        >>> d_list = DoublyLinkedList()
+        >>> for i in range(3): d_list.append(i)
+        >>> d_list.prepend(-1)
+        >>> d_list.__repr__(), d_list.__len__()
+        ('List:-1<->0<->1<->2', 4)
+        >>> verbose_list = DoublyLinkedList(compact=True, on_event=print_event)
+        >>> verbose_list.append(4)
+        4 inserted
+        >>> verbose_list.pop()
+        4 deleted
+        4
+        """
+        super(DoublyLinkedList, self).__init__()
+        self.node_class = CompactDoublyLinkedNode if compact else DoublyLinkedNode
+        self.__on_event = on_event
+        self.head = None
+        self.tail = None
+        self.__length = 0
+
+    def __len__(self):
+        return self.__length
+
+    def __iter__(self):
+        """
+        >>> d_list = DoublyLinkedList()
+        >>> for i in range(3): d_list.append(i)
+        >>> list(d_list), list(d_list.__reversed__())
+        ([0, 1, 2], [2, 1, 0])
+        """
+        node = self.head
+        while node is not None:
+            yield node.item
+            node = node.next
+
+    def __reversed__(self):
+        node = self.tail
+        while node is not None:
+            yield node.item
+            node = node.prev
+
+    def __contains__(self, item):
+        node = self.head
+        while node is not None:
+            if node.item == item:
+                return True
+            node = node.next
+        return False
+
+    def append_node(self, node):
+        node.prev = self.tail
+        node.next = None
+        if self.tail is not None:
+            self.tail.next = node
+        else:
+            self.head = node
+        self.tail = node
+        self.__length += 1
+        if self.__on_event is not None:
+            self.__on_event("insert", node.item)
+
+    def prepend_node(self, node):
+        node.prev = None
+        node.next = self.head
+        if self.head is not None:
+            self.head.prev = node
+        else:
+            self.tail = node
+        self.head = node
+        self.__length += 1
+        if self.__on_event is not None:
+            self.__on_event("insert", node.item)
+
+    def append(self, item):
+        self.append_node(self.node_class(item))
+
+    def prepend(self, item):
+        self.prepend_node(self.node_class(item))
+
+    def unlink(self, node):
+        """
+        Detach `node` from the list in O(1) and return its item.
+
+        >>> d_list = DoublyLinkedList()
+        >>> for i in range(3): d_list.append(i)
+        >>> d_list.unlink(d_list.head.next)
+        1
+        >>> d_list.__repr__(), d_list.head.next.prev is d_list.head
+        ('List:0<->2', True)
+        """
+        if node.prev is not None:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        if node.next is not None:
+            node.next.prev = node.prev
+        else:
+            self.tail = node.prev
+        node.prev = None
+        node.next = None
+        self.__length -= 1
+        if self.__on_event is not None:
+            self.__on_event("delete", node.item)
+        return node.item
+
+    def move_to_end(self, node):
+        """
+        Move a node already in the list to the tail without firing events.
+
+        >>> d_list = DoublyLinkedList()
+        >>> for i in range(3): d_list.append(i)
+        >>> d_list.move_to_end(d_list.head)
+        >>> d_list.__repr__()
+        'List:1<->2<->0'
+        """
+        if node is self.tail:
+            return
+        if node.prev is not None:
+            node.prev.next = node.next
+        else:
+            self.head = node.next
+        node.next.prev = node.prev
+        node.prev = self.tail
+        node.next = None
+        self.tail.next = node
+        self.tail = node
+
+    def remove(self, item):
+        """
+        >>> d_list = DoublyLinkedList()
+        >>> d_list.append(4)
+        >>> d_list.remove(4), d_list.remove(10)
+        (1, 0)
+        """
+        node = self.head
+        while node is not None:
+            if node.item == item:
+                self.unlink(node)
+                return 1
+            node = node.next
+        return 0
+
+    def pop(self):
+        """
+        >>> d_list = DoublyLinkedList()
+        >>> d_list.pop()
+        Traceback (most recent call last):
+        ...
+        IndexError: pop from an empty list
+        """
+        if self.tail is None:
+            raise IndexError("pop from an empty list")
+        return self.unlink(self.tail)
+
+    def popleft(self):
+        """
+        >>> d_list = DoublyLinkedList()
+        >>> d_list.append(4)
+        >>> d_list.append(5)
+        >>> d_list.popleft(), d_list.popleft()
+        (4, 5)
+        >>> d_list.popleft()
+        Traceback (most recent call last):
+        ...
+        IndexError: popleft from an empty list
+        """
+        if self.head is None:
+            raise IndexError("popleft from an empty list")
+        return self.unlink(self.head)
+
+    def __repr__(self):
+        return "List:" + "<->".join([str(item) for item in self])
+
+
+class Deque(DoublyLinkedList):
+    def __init__(self, maxlen=None, compact=False, on_event=None):
+        """
+        Double-ended queue; with `maxlen` set, pushing onto a full deque
+        drops an item from the opposite end, like collections.deque.
+
+        >>> deque = Deque(maxlen=3)
+        >>> for i in range(5): deque.append(i)
+        >>> list(deque), deque.maxlen
+        ([2, 3, 4], 3)
+        >>> deque.appendleft(1)
+        >>> list(deque), deque.peek(), deque.peekleft()
+        ([1, 2, 3], 3, 1)
+        >>> deque.pop(), deque.popleft(), deque.__len__()
+        (3, 1, 1)
+        """
+        super(Deque, self).__init__(compact, on_event)
+        self.__maxlen = maxlen
+
+    @property
+    def maxlen(self):
+        return self.__maxlen
+
+    def append_node(self, node):
+        super(Deque, self).append_node(node)
+        if self.__maxlen is not None and len(self) > self.__maxlen:
+            self.popleft()
+
+    def prepend_node(self, node):
+        super(Deque, self).prepend_node(node)
+        if self.__maxlen is not None and len(self) > self.__maxlen:
+            self.pop()
+
+    def appendleft(self, item):
+        self.prepend(item)
+
+    def peek(self):
+        if self.tail is None:
+            raise IndexError("peek from an empty deque")
+        return self.tail.item
+
+    def peekleft(self):
+        if self.head is None:
+            raise IndexError("peek from an empty deque")
+        return self.head.item
+
+
+_SNAPSHOT_MAGIC = "DSSNAP01"
+_SNAPSHOT_HEADER = struct.Struct("<8s8sQ")
+_CHUNK_HEADER = struct.Struct("<cI")
+
+
+def _dump_snapshot(fileobj, kind, count, items, chunk_size):
+    """
+    Stream `count` (key, value) pairs to `fileobj` as length-prefixed
+    chunks. Chunks are marshalled, falling back to pickle for chunks holding
+    objects marshal cannot encode.
+    """
+    fileobj.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, kind, count))
+    chunk = []
+    for item in items:
+        chunk.append(item)
+        if len(chunk) == chunk_size:
+            _dump_chunk(fileobj, chunk)
+            chunk = []
+    if chunk:
+        _dump_chunk(fileobj, chunk)
+
+
+def _dump_chunk(fileobj, chunk):
+    try:
+        codec, payload = "m", marshal.dumps(chunk, 2)
+    except ValueError:
+        codec, payload = "p", pickle.dumps(chunk, 2)
+    fileobj.write(_CHUNK_HEADER.pack(codec, len(payload)))
+    fileobj.write(payload)
+
+
+def _load_snapshot(fileobj, kind):
+    """Read a snapshot header; returns the entry count and a generator of chunks."""
+    magic, found, count = _SNAPSHOT_HEADER.unpack(fileobj.read(_SNAPSHOT_HEADER.size))
+    if magic != _SNAPSHOT_MAGIC:
+        raise ValueError("not a snapshot")
+    if found.rstrip("\x00") != kind:
+        raise ValueError("snapshot holds a %s, not a %s" % (found.rstrip("\x00"), kind))
+
+    def chunks():
+        remaining = count
+        while remaining:
+            codec, length = _CHUNK_HEADER.unpack(fileobj.read(_CHUNK_HEADER.size))
+            payload = fileobj.read(length)
+            chunk = marshal.loads(payload) if codec == "m" else pickle.loads(payload)
+            remaining -= len(chunk)
+            yield chunk
+    return count, chunks()
+
+
+def _hash_batch(hashfunc, keys):
+    """
+    Hash a batch of keys in one pass; returns the keys as a list and their
+    hashes. Integer NumPy arrays hashed with the builtin hash are done
+    vectorized, as hash() of a machine integer is the integer itself with
+    -1 mapped to -2.
+
+    >>> _hash_batch(hash, (1, -1, 2))
+    ([1, -1, 2], [1, -2, 2])
+    """
+    if _vectorizable(hashfunc, keys):
+        hashes = keys.astype(numpy.int64)
+        hashes[hashes == -1] = -2
+        return keys.tolist(), hashes.tolist()
+    if not isinstance(keys, list):
+        keys = list(keys)
+    return keys, [hashfunc(key) for key in keys]
+
+
+def _vectorizable(hashfunc, keys):
+    return (numpy is not None and hashfunc is hash and isinstance(keys, numpy.ndarray) and
+            (keys.dtype.kind == "i" or keys.dtype.kind == "u" and keys.dtype.itemsize < 8))
+
+
+def _packed_dtype(packer):
+    # struct's standard sizes differ from NumPy's platform ones ("<l" is 4
+    # bytes to struct, 8 to NumPy on 64-bit Linux), so integers go by size.
+    code = packer.format[1:]
+    if code in "bBhHiIlLqQ":
+        return numpy.dtype("<%s%d" % ("u" if code.isupper() else "i", packer.size))
+    return numpy.dtype(packer.format)
+
+
+class ResizePolicy(object):
+    def __init__(self, growth_factor=2, shrink_threshold=None, power_of_two=False, min_bin_count=8):
+        """
+        Sizing rules shared by ChainedHashDict and OpenAddressHashDict.
+        Tables grow by `growth_factor` once over their max load and, when
+        `shrink_threshold` is set, shrink back towards the live set once the
+        load falls below it. With `power_of_two` every size is rounded up to
+        a power of two so home slots can be found with a mask instead of %.
+        Keep shrink_threshold well under max_load / growth_factor so a table
+        that has just shrunk does not immediately grow again.
+
+        >>> policy = ResizePolicy(growth_factor=1.5, shrink_threshold=0.1, power_of_two=True)
+        >>> policy.size_for(10), policy.grow(16)
+        (16, 32)
+        >>> policy.shrink(10, 1024, 0.7), policy.shrink(500, 1024, 0.7)
+        (32, None)
+        >>> ResizePolicy().grow(10), ResizePolicy().shrink(0, 1024, 0.7)
+        (20, None)
+        """
+        super(ResizePolicy, self).__init__()
+        self.growth_factor = growth_factor
+        self.shrink_threshold = shrink_threshold
+        self.power_of_two = power_of_two
+        self.min_bin_count = min_bin_count
+
+    def size_for(self, bin_count):
+        if self.power_of_two:
+            size = 1
+            while size < bin_count:
+                size <<= 1
+            return size
+        return bin_count
+
+    def grow(self, bin_count):
+        return self.size_for(max(bin_count + 1, int(math.ceil(bin_count * self.growth_factor))))
+
+    def shrink(self, length, bin_count, max_load):
+        """Smaller bin count for `length` live entries, or None to stay put."""
+        if self.shrink_threshold is None or length >= self.shrink_threshold * bin_count:
+            return None
+        target = max(self.min_bin_count, self.size_for(int(length * self.growth_factor / max_load) + 1))
+        return target if target < bin_count else None
+
+
+class HashTableStats(object):
+    def __init__(self, sample_every=0, sampler=None):
+        """
+        Opt-in instrumentation for ChainedHashDict and OpenAddressHashDict.
+        Every `sample_every` operations `sampler` is called with snapshot().
+
+        >>> stats = HashTableStats()
+        >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(1), stats=stats)
+        >>> for key in range(3): chained_hash[key] = str(key)
+        >>> chained_hash.__getitem__(0), chained_hash.__getitem__(9)
+        ('0', None)
+        >>> sorted(stats.operations.items())
+        [('get', 2), ('set', 3)]
+        >>> sorted(stats.probe_histogram.items())
+        [(0, 1), (1, 1), (2, 1), (3, 2)]
+        """
+        super(HashTableStats, self).__init__()
+        self.sample_every = sample_every
+        self.sampler = sampler
+        self.reset()
+
+    def reset(self):
+        self.operations = {}
+        self.operation_seconds = {}
+        self.probe_histogram = {}
+        self.rebuilds = 0
+        self.rebuild_seconds = 0.0
+        self.__count = 0
+
+    def record(self, operation, seconds, probes, hash_dict):
+        self.operations[operation] = self.operations.get(operation, 0) + 1
+        self.operation_seconds[operation] = self.operation_seconds.get(operation, 0.0) + seconds
+        self.probe_histogram[probes] = self.probe_histogram.get(probes, 0) + 1
+        self.__count += 1
+        if self.sampler is not None and self.sample_every and self.__count % self.sample_every == 0:
+            self.sampler(self.snapshot(hash_dict))
+
+    def record_rebuild(self, seconds):
+        self.rebuilds += 1
+        self.rebuild_seconds += seconds
+
+    def snapshot(self, hash_dict=None):
+        """
+        >>> stats = HashTableStats()
+        >>> open_hash = OpenAddressHashDict(stats=stats)
+        >>> for key in range(8): open_hash[key] = str(key)
+        >>> del open_hash[3]
+        >>> snapshot = stats.snapshot(open_hash)
+        >>> snapshot['rebuilds'], snapshot['length'], snapshot['bin_count'], snapshot['tombstone_ratio']
+        (1, 7, 20, 0.05)
+        >>> snapshot['mean_probes'] > 0
+        True
+        """
+        total = sum(self.probe_histogram.values())
+        snapshot = {
+            'operations': dict(self.operations),
+            'mean_seconds': dict((operation, self.operation_seconds[operation] / count)
+                                 for operation, count in self.operations.items()),
+            'probe_histogram': dict(self.probe_histogram),
+            'mean_probes': float(sum(probes * count for probes, count in self.probe_histogram.items())) / total
+            if total else 0.0,
+            'rebuilds': self.rebuilds,
+            'rebuild_seconds': self.rebuild_seconds,
+        }
+        if hash_dict is not None:
+            snapshot['length'] = len(hash_dict)
+            snapshot['bin_count'] = hash_dict.bin_count
+            snapshot['load_factor'] = hash_dict.load_factor
+            if hasattr(hash_dict, 'tombstones'):
+                snapshot['tombstone_ratio'] = float(hash_dict.tombstones) / hash_dict.bin_count
+        return snapshot
+
+
 class ChainedHashDict(object):
-    def __init__(self, bin_count=10, max_load=0.7, hashfunc=hash):
+    def __init__(self, bin_count=10, max_load=0.7, hashfunc=hash, compact=False, incremental=False,
+                 rehash_step=1, on_event=None, stats=None, resize_policy=None):
         """
         >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
+        >>> masked_hash = ChainedHashDict(resize_policy=ResizePolicy(power_of_two=True))
+        >>> masked_hash.bin_count
+        16
+        >>> compact_hash = ChainedHashDict(hashfunc=terrible_hash(11), compact=True)
+        >>> incremental_hash = ChainedHashDict(incremental=True, rehash_step=4)
+        >>> verbose_hash = ChainedHashDict(on_event=print_event)
+        >>> verbose_hash.__setitem__(5, "five")
+        (5, 'five') inserted
+        >>> verbose_hash.__setitem__(5, "FIVE")
+        (5, 'FIVE') updated
+        >>> verbose_hash.__delitem__(5)
+        (5, 'FIVE') deleted
         """
         super(ChainedHashDict, self).__init__()
+        self.__on_event = on_event
+        self.__stats = stats
+        self.__compact = compact
+        self.__policy = resize_policy if resize_policy is not None else ResizePolicy()
+        bin_count = self.__policy.size_for(bin_count)
         self.__bin_count = bin_count
+        self.__mask = bin_count - 1 if self.__policy.power_of_two else None
         self.hash_table = [None] * bin_count
         self.hash_fun = hashfunc
         self.__max_load = max_load
         self.__length = 0
+        self.__incremental = incremental
+        self.__rehash_step = rehash_step
+        self.__old_table = None
+        self.__rehash_index = 0
 
     @property
     def load_factor(self):
         """
         >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
         >>> chained_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> chained_hash.load_factor
         0.1
         """
@@ -200,100 +837,433 @@ class ChainedHashDict(object):
         """
         return self.__bin_count
 
+    @property
+    def rehashing(self):
+        """
+        >>> chained_hash = ChainedHashDict(bin_count=4, incremental=True, rehash_step=2)
+        >>> for key in range(3): chained_hash.__setitem__(key, str(key))
+        >>> chained_hash.rehashing
+        True
+        >>> chained_hash.bin_count
+        8
+        >>> chained_hash.__getitem__(0)
+        '0'
+        >>> for key in range(3, 5): chained_hash.__setitem__(key, str(key))
+        >>> chained_hash.rehashing
+        False
+        >>> [chained_hash.__getitem__(key) for key in range(5)]
+        ['0', '1', '2', '3', '4']
+        """
+        return self.__old_table is not None
+
     def rebuild(self, bin_count):
+        """
+        Grow when over the max load; shrink when the resize policy allows it.
+
+        >>> policy = ResizePolicy(shrink_threshold=0.1)
+        >>> chained_hash = ChainedHashDict(resize_policy=policy)
+        >>> for key in range(1000): chained_hash[key] = key
+        >>> chained_hash.bin_count
+        2560
+        >>> for key in range(990): del chained_hash[key]
+        >>> chained_hash.bin_count, sorted(chained_hash[key] for key in range(990, 1000))[:2]
+        (58, [990, 991])
+        """
         if self.load_factor > self.__max_load:
-            self.__length = 0
-            self.__bin_count *= 2
-            old_table = self.hash_table
-            self.hash_table = [None] * self.bin_count
-            for index in range(len(old_table)):
-                linked_list = old_table[index]
+            self.__resize(self.__policy.grow(bin_count), self.__incremental)
+        else:
+            shrunk = self.__policy.shrink(self.__length, bin_count, self.__max_load)
+            if shrunk is not None:
+                self.__resize(shrunk, self.__incremental)
+
+    def __resize(self, bin_count, incremental=False):
+        if self.__stats is not None:
+            started = clock()
+        if self.__old_table is not None:
+            self.__rehash(len(self.__old_table))
+        old_table = self.hash_table
+        self.__bin_count = bin_count
+        self.__mask = bin_count - 1 if self.__policy.power_of_two else None
+        self.hash_table = [None] * bin_count
+        if incremental:
+            self.__old_table = old_table
+            self.__rehash_index = 0
+        else:
+            for linked_list in old_table:
                 if linked_list is not None:
-                    node = linked_list.head
-                    while node is not None:
-                        self.__setitem__(node.item[0], node.item[1])
-                        node = node.next
+                    self.__move_chain(linked_list)
+        if self.__stats is not None:
+            self.__stats.record_rebuild(clock() - started)
+
+    def __reserve(self, count):
+        bin_count = self.__policy.size_for(int(count / self.__max_load) + 1)
+        if bin_count > self.__bin_count:
+            self.__resize(bin_count)
+
+    def __move_chain(self, linked_list):
+        mask = self.__mask
+        while linked_list.head is not None:
+            node = linked_list.popleft_node()
+            hashed = node.item[2]
+            index = hashed & mask if mask is not None else hashed % self.__bin_count
+            target = self.hash_table[index]
+            if target is None:
+                target = SinglyLinkedList(self.__compact)
+                self.hash_table[index] = target
+            target.prepend_node(node)
+
+    def __rehash(self, steps):
+        old_table = self.__old_table
+        empty_visits = steps * 10
+        while steps > 0 and self.__rehash_index < len(old_table):
+            linked_list = old_table[self.__rehash_index]
+            if linked_list is None:
+                empty_visits -= 1
+                if empty_visits == 0:
+                    break
+            else:
+                old_table[self.__rehash_index] = None
+                self.__move_chain(linked_list)
+                steps -= 1
+            self.__rehash_index += 1
+        if self.__rehash_index == len(old_table):
+            self.__old_table = None
+
+    def __chain(self, hashed):
+        old_table = self.__old_table
+        if old_table is not None:
+            old_index = hashed & (len(old_table) - 1) if self.__mask is not None else hashed % len(old_table)
+            if old_table[old_index] is not None:
+                return old_table, old_index
+        if self.__mask is not None:
+            return self.hash_table, hashed & self.__mask
+        return self.hash_table, hashed % self.__bin_count
+
+    def __find(self, linked_list, key, hashed):
+        previous = None
+        node = linked_list.head
+        probes = 0
+        while node is not None:
+            probes += 1
+            item = node.item
+            if item[2] == hashed and item[0] == key:
+                return previous, node, probes
+            previous = node
+            node = node.next
+        return previous, None, probes
+
+    def chain_lengths(self):
+        """
+        Histogram of chain lengths over all bins; scans the whole table.
+
+        >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(1))
+        >>> for key in range(3): chained_hash[key] = str(key)
+        >>> sorted(chained_hash.chain_lengths().items())
+        [(0, 9), (3, 1)]
+        """
+        histogram = {}
+        for table in (self.hash_table, self.__old_table or []):
+            for linked_list in table:
+                length = 0 if linked_list is None else len(linked_list)
+                histogram[length] = histogram.get(length, 0) + 1
+        if self.__old_table is not None:
+            histogram[0] -= len(self.__old_table)
+        return histogram
 
     def __getitem__(self, key):
         """
         >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
         >>> chained_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> chained_hash.__getitem__(5)
         'five'
         >>> chained_hash.__getitem__(15)
         """
-        linked_list = self.hash_table[self.hash_fun(key) % self.bin_count]
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        hashed = self.hash_fun(key)
+        table, index = self.__chain(hashed)
+        linked_list = table[index]
+        value = None
+        probes = 0
         if linked_list is not None:
             node = linked_list.head
             while node is not None:
-                if node.item[0] == key:
-                    return node.item[1]
+                probes += 1
+                item = node.item
+                if item[2] == hashed and item[0] == key:
+                    value = item[1]
+                    break
                 else:
                     node = node.next
-        return None
+        if stats is not None:
+            elapsed = clock() - started
+            stats.record("get", elapsed, probes, self)
+        return value
 
     def __setitem__(self, key, value):
         """
         >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
         >>> chained_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
+        >>> chained_hash.__setitem__(5, "FIVE")
+        >>> chained_hash.__getitem__(5), chained_hash.__len__()
+        ('FIVE', 1)
         """
-        item = (key, value)
-        index = self.hash_fun(key) % self.bin_count
-        linked_list = self.hash_table[index]
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        if self.__old_table is not None:
+            self.__rehash(self.__rehash_step)
+        hashed = self.hash_fun(key)
+        item = (key, value, hashed)
+        table, index = self.__chain(hashed)
+        linked_list = table[index]
+        node = None
+        probes = 0
         if linked_list is None:
-            linked_list = SinglyLinkedList()
-        linked_list.prepend(item)
-        self.hash_table[index] = linked_list
-        self.__length += 1
-        self.rebuild(self.bin_count)
-        return str(item) + " inserted"
+            linked_list = SinglyLinkedList(self.__compact)
+            table[index] = linked_list
+        else:
+            node, probes = self.__find(linked_list, key, hashed)[1:]
+        if node is not None:
+            node.item = item
+            event = "update"
+        else:
+            linked_list.prepend(item)
+            self.__length += 1
+            self.rebuild(self.bin_count)
+            event = "insert"
+        if stats is not None:
+            stats.record("set", clock() - started, probes, self)
+        if self.__on_event is not None:
+            self.__on_event(event, (key, value))
 
-    def __delitem__(self, key):
+    def setdefault(self, key, default=None):
         """
         >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
-        >>> chained_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> chained_hash.__delitem__(5)
-        item: (5, 'five') removed from hash table
-        >>> chained_hash.__delitem__(6)
-        No item with key =  6 found in hash table.
+        >>> chained_hash.setdefault(5, "five")
+        'five'
+        >>> chained_hash.setdefault(5, "FIVE")
+        'five'
+        >>> chained_hash.__len__()
+        1
         """
-        value = self.__getitem__(key)
-        if value is not None:
-            item = (key, value)
-            index = self.hash_fun(key) % self.bin_count
-            linked_list = self.hash_table[index]
-            linked_list.remove(item)
-            if linked_list.head is None:
-                self.hash_table[index] = None
-            self.__length -= 1
-            print "item: " + str(item) + " removed from hash table"
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        if self.__old_table is not None:
+            self.__rehash(self.__rehash_step)
+        hashed = self.hash_fun(key)
+        table, index = self.__chain(hashed)
+        linked_list = table[index]
+        node = None
+        probes = 0
+        if linked_list is None:
+            linked_list = SinglyLinkedList(self.__compact)
+            table[index] = linked_list
         else:
-            print "No item with key =  " + str(key) + " found in hash table."
+            node, probes = self.__find(linked_list, key, hashed)[1:]
+        if node is not None:
+            value = node.item[1]
+        else:
+            value = default
+            linked_list.prepend((key, default, hashed))
+            self.__length += 1
+            self.rebuild(self.bin_count)
+        if stats is not None:
+            stats.record("setdefault", clock() - started, probes, self)
+        if node is None and self.__on_event is not None:
+            self.__on_event("insert", (key, default))
+        return value
+
+    def pop(self, key, default=_MISSING):
+        """
+        >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
+        >>> chained_hash.__setitem__(5, "five")
+        >>> chained_hash.pop(5)
+        'five'
+        >>> chained_hash.pop(5, "gone")
+        'gone'
+        >>> chained_hash.pop(5)
+        Traceback (most recent call last):
+        ...
+        KeyError: 5
+        """
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        if self.__old_table is not None:
+            self.__rehash(self.__rehash_step)
+        hashed = self.hash_fun(key)
+        table, index = self.__chain(hashed)
+        linked_list = table[index]
+        item = None
+        probes = 0
+        if linked_list is not None:
+            previous, node, probes = self.__find(linked_list, key, hashed)
+            if node is not None:
+                item = linked_list.remove_after(previous)
+                if linked_list.head is None:
+                    table[index] = None
+                self.__length -= 1
+                self.rebuild(self.__bin_count)
+        if stats is not None:
+            stats.record("pop", clock() - started, probes, self)
+        if item is not None:
+            if self.__on_event is not None:
+                self.__on_event("delete", item[:2])
+            return item[1]
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def update(self, items):
+        """
+        >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
+        >>> chained_hash.update([(5, "five"), (6, "six"), (5, "FIVE")])
+        >>> chained_hash.update({7: "seven"})
+        >>> chained_hash.__len__(), chained_hash.__getitem__(5)
+        (3, 'FIVE')
+        >>> chained_hash.update((key, str(key)) for key in range(100))
+        >>> chained_hash.bin_count
+        148
+        """
+        if hasattr(items, 'items'):
+            items = items.items()
+        elif not hasattr(items, '__len__'):
+            items = list(items)
+        self.__reserve(self.__length + len(items))
+        for key, value in items:
+            self.__setitem__(key, value)
+
+    @classmethod
+    def from_items(cls, items, **kwargs):
+        """
+        >>> chained_hash = ChainedHashDict.from_items((key, str(key)) for key in range(1000))
+        >>> chained_hash.__len__(), chained_hash.bin_count, chained_hash.__getitem__(999)
+        (1000, 1429, '999')
+        """
+        hash_dict = cls(**kwargs)
+        hash_dict.update(items)
+        return hash_dict
+
+    def items(self):
+        """
+        >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(1))
+        >>> chained_hash.update({1: "one", 2: "two"})
+        >>> sorted(chained_hash.items())
+        [(1, 'one'), (2, 'two')]
+        """
+        for table in (self.hash_table, self.__old_table or []):
+            for linked_list in table:
+                if linked_list is not None:
+                    node = linked_list.head
+                    while node is not None:
+                        yield node.item[:2]
+                        node = node.next
+
+    def dump(self, fileobj, chunk_size=4096):
+        """
+        Write a binary snapshot of the entries to `fileobj`.
+
+        >>> import io
+        >>> chained_hash = ChainedHashDict.from_items((key, str(key)) for key in range(1000))
+        >>> snapshot = io.BytesIO()
+        >>> chained_hash.dump(snapshot, chunk_size=300)
+        >>> restored = ChainedHashDict.load(io.BytesIO(snapshot.getvalue()))
+        >>> restored.__len__(), restored.bin_count, restored.__getitem__(999)
+        (1000, 1429, '999')
+        """
+        _dump_snapshot(fileobj, "chained", self.__length, self.items(), chunk_size)
+
+    @classmethod
+    def load(cls, fileobj, **kwargs):
+        """Rebuild a dict written by dump(), presized for its entry count."""
+        count, chunks = _load_snapshot(fileobj, "chained")
+        hash_dict = cls(**kwargs)
+        hash_dict.__reserve(count)
+        for chunk in chunks:
+            hash_dict.update(chunk)
+        return hash_dict
+
+    def __delitem__(self, key):
+        """
+        >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
+        >>> chained_hash.__setitem__(5, "five")
+        >>> chained_hash.__delitem__(5)
+        >>> chained_hash.__delitem__(6)
+        Traceback (most recent call last):
+        ...
+        KeyError: 6
+        """
+        self.pop(key)
+
+    def get_many(self, keys, default=None):
+        """
+        Look up a batch of keys, returning a list of values aligned with
+        `keys` and `default` for missing ones. The batch is hashed in one pass.
+
+        >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(2))
+        >>> chained_hash.update((key, str(key)) for key in range(5))
+        >>> chained_hash.get_many([4, 0, 9, 4])
+        ['4', '0', None, '4']
+        """
+        keys, hashes = _hash_batch(self.hash_fun, keys)
+        values = [default] * len(keys)
+        for position, hashed in enumerate(hashes):
+            table, index = self.__chain(hashed)
+            linked_list = table[index]
+            if linked_list is None:
+                continue
+            key = keys[position]
+            node = linked_list.head
+            while node is not None:
+                item = node.item
+                if item[2] == hashed and item[0] == key:
+                    values[position] = item[1]
+                    break
+                node = node.next
+        return values
+
+    def contains_many(self, keys):
+        """
+        >>> chained_hash = ChainedHashDict()
+        >>> chained_hash.update({1: None, 2: "two"})
+        >>> chained_hash.contains_many([1, 2, 3])
+        [True, True, False]
+        """
+        return [value is not _MISSING for value in self.get_many(keys, _MISSING)]
 
     def __contains__(self, key):
         """
         >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
         >>> chained_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> chained_hash.__contains__(5)
         True
         >>> chained_hash.__contains__(7)
         False
+        >>> chained_hash.__setitem__(7, None)
+        >>> chained_hash.__contains__(7)
+        True
         """
-        value = self.__getitem__(key)
-        if value is not None:
-            return True
-        else:
-            return False
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        hashed = self.hash_fun(key)
+        table, index = self.__chain(hashed)
+        linked_list = table[index]
+        node = None
+        probes = 0
+        if linked_list is not None:
+            node, probes = self.__find(linked_list, key, hashed)[1:]
+        if stats is not None:
+            stats.record("contains", clock() - started, probes, self)
+        return node is not None
 
     def __len__(self):
         """
         >>> chained_hash = ChainedHashDict(hashfunc=terrible_hash(11))
         >>> chained_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> chained_hash.__len__()
         1
         """
@@ -303,7 +1273,6 @@ class ChainedHashDict(object):
         """
         >>> chained_hash = ChainedHashDict(bin_count=1, hashfunc=terrible_hash(11))
         >>> chained_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> chained_hash.display()
         ---------------Display Hash Table-----------
         0 | Empty
@@ -319,21 +1288,53 @@ class ChainedHashDict(object):
                 print str(index) + " | Empty"
                 print "-----------"
             else:
-                print str(index) + " | ->" + "->".join([str(item) for item in linked_list])
+                items = []
+                node = linked_list.head
+                while node is not None:
+                    items.append(str(node.item[:2]))
+                    node = node.next
+                print str(index) + " | ->" + "->".join(items)
                 print "-----------"
 
 
 class OpenAddressHashDict(object):
-    def __init__(self, bin_count=10, max_load=0.7, hashfunc=hash):
+    def __init__(self, bin_count=10, max_load=0.7, hashfunc=hash, robin_hood=False, tombstone_ratio=0.2,
+                 on_event=None, stats=None, resize_policy=None):
         """
         >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
+        >>> masked_hash = OpenAddressHashDict(robin_hood=True, resize_policy=ResizePolicy(power_of_two=True))
+        >>> for key in range(-50, 50): masked_hash[key] = key
+        >>> masked_hash.bin_count, [masked_hash[key] for key in (-50, 0, 49)]
+        (256, [-50, 0, 49])
+        >>> robin_hood_hash = OpenAddressHashDict(robin_hood=True)
+        >>> verbose_hash = OpenAddressHashDict(on_event=print_event)
+        >>> verbose_hash.__setitem__(5, "five")
+        (5, 'five') inserted
+        >>> verbose_hash.__setitem__(5, "FIVE")
+        (5, 'FIVE') updated
+        >>> verbose_hash.__delitem__(5)
+        (5, 'FIVE') deleted
+        >>> OpenAddressHashDict(max_load=1.0)
+        Traceback (most recent call last):
+        ...
+        ValueError: max_load must be between 0 and 1 for open addressing
         """
+        if not 0 < max_load < 1:
+            raise ValueError("max_load must be between 0 and 1 for open addressing")
         super(OpenAddressHashDict, self).__init__()
+        self.__on_event = on_event
+        self.__stats = stats
+        self.__policy = resize_policy if resize_policy is not None else ResizePolicy()
+        bin_count = self.__policy.size_for(bin_count)
         self.__bin_count = bin_count
-        self.__max_load = 0.7
+        self.__mask = bin_count - 1 if self.__policy.power_of_two else None
+        self.__max_load = max_load
         self.__hash_fun = hashfunc
+        self.__robin_hood = robin_hood
+        self.__tombstone_ratio = tombstone_ratio
         self.hash_table = [None] * bin_count
         self.__length = 0
+        self.__tombstones = 0
 
     @property
     def load_factor(self):
@@ -342,7 +1343,6 @@ class OpenAddressHashDict(object):
         >>> open_hash.load_factor
         0.0
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> open_hash.load_factor
         0.1
         """
@@ -353,100 +1353,358 @@ class OpenAddressHashDict(object):
         """
         >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> open_hash.bin_count
         10
         """
         return self.__bin_count
 
+    @property
+    def tombstones(self):
+        """
+        >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(1))
+        >>> for key in range(3): open_hash.__setitem__(key, str(key))
+        >>> open_hash.__delitem__(0)
+        >>> open_hash.tombstones
+        1
+        >>> open_hash.__getitem__(2)
+        '2'
+        >>> open_hash.__delitem__(2)
+        >>> open_hash.__delitem__(1)
+        >>> open_hash.tombstones
+        0
+        """
+        return self.__tombstones
+
     def rebuild(self, bincount):
+        """
+        Grow when over the max load, shrink when the resize policy allows
+        it, otherwise compact away tombstones once there are too many or
+        once live entries and tombstones together pass the max load, so a
+        probe always reaches an empty slot.
+
+        >>> open_hash = OpenAddressHashDict(resize_policy=ResizePolicy(shrink_threshold=0.1))
+        >>> for key in range(1000): open_hash[key] = key
+        >>> for key in range(990): del open_hash[key]
+        >>> open_hash.bin_count, open_hash.tombstones, open_hash[999]
+        (58, 10, 999)
+        >>> churned = OpenAddressHashDict(max_load=0.9, tombstone_ratio=0.5)
+        >>> for key in range(5): churned[key] = key
+        >>> for key in range(5, 10000): churned[key] = key; del churned[key - 5]
+        >>> churned.__len__(), churned[9999], churned[0]
+        (5, 9999, None)
+        """
         if self.load_factor > self.__max_load:
-            self.__length = 0
-            bincount *= 2
-            self.__bin_count = bincount
-            old_table = self.hash_table
-            self.hash_table = [None] * self.bin_count
-            for index in range(len(old_table)):
-                item = old_table[index]
-                if item is not None:
-                    self.__setitem__(item[0], item[1])
+            self.__resize(self.__policy.grow(bincount))
+            return
+        shrunk = self.__policy.shrink(self.__length, bincount, self.__max_load)
+        if shrunk is not None:
+            self.__resize(shrunk)
+        elif (self.__tombstones > self.__tombstone_ratio * self.__bin_count or
+              self.__length + self.__tombstones > self.__max_load * self.__bin_count):
+            self.__resize(bincount)
+
+    def __resize(self, bin_count):
+        if self.__stats is not None:
+            started = clock()
+        old_table = self.hash_table
+        self.__bin_count = bin_count
+        self.__mask = bin_count - 1 if self.__policy.power_of_two else None
+        self.hash_table = [None] * bin_count
+        self.__tombstones = 0
+        for entry in old_table:
+            if entry is not None and entry is not DELETED:
+                self.__place(entry)
+        if self.__stats is not None:
+            self.__stats.record_rebuild(clock() - started)
+
+    def __reserve(self, count):
+        bin_count = self.__policy.size_for(int(count / self.__max_load) + 1)
+        if bin_count > self.__bin_count:
+            self.__resize(bin_count)
+
+    def __place(self, entry):
+        table = self.hash_table
+        bin_count = self.__bin_count
+        mask = self.__mask
+        index = entry[2] & mask if mask is not None else entry[2] % bin_count
+        if self.__robin_hood:
+            distance = 0
+            while table[index] is not None:
+                resident = table[index]
+                offset = index - resident[2]
+                resident_distance = offset & mask if mask is not None else offset % bin_count
+                if resident_distance < distance:
+                    table[index] = entry
+                    entry = resident
+                    distance = resident_distance
+                index += 1
+                if index == bin_count:
+                    index = 0
+                distance += 1
+        else:
+            while table[index] is not None and table[index] is not DELETED:
+                index += 1
+                if index == bin_count:
+                    index = 0
+            if table[index] is DELETED:
+                self.__tombstones -= 1
+        table[index] = entry
+
+    def __find(self, key, hashed):
+        table = self.hash_table
+        bin_count = self.__bin_count
+        mask = self.__mask
+        index = hashed & mask if mask is not None else hashed % bin_count
+        entry = table[index]
+        probes = 0
+        if self.__robin_hood:
+            while entry is not None:
+                probes += 1
+                if entry[2] == hashed and entry[0] == key:
+                    return index, probes
+                offset = index - entry[2]
+                if (offset & mask if mask is not None else offset % bin_count) < probes - 1:
+                    break
+                index += 1
+                if index == bin_count:
+                    index = 0
+                entry = table[index]
+        else:
+            while entry is not None:
+                probes += 1
+                if entry is not DELETED and entry[2] == hashed and entry[0] == key:
+                    return index, probes
+                index += 1
+                if index == bin_count:
+                    index = 0
+                entry = table[index]
+        return -1, probes
 
     def __getitem__(self, key):
         """
         >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> open_hash.__getitem__(5)
         'five'
         >>> open_hash.__getitem__(10)
         """
-        i = 0
-        index = (self.__hash_fun(key) + i) % self.bin_count
-        item = self.hash_table[index]
-        while item is not None and item[0] != key:
-            i += 1
-            index = (self.__hash_fun(key) + i) % self.bin_count
-            item = self.hash_table[index]
-        if item is not None and item != DELETED:
-            return item[1]
-        else:
-            return None
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        hashed = self.__hash_fun(key)
+        index, probes = self.__find(key, hashed)
+        value = self.hash_table[index][1] if index >= 0 else None
+        if stats is not None:
+            elapsed = clock() - started
+            stats.record("get", elapsed, probes, self)
+        return value
 
     def __setitem__(self, key, value):
         """
         >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        """
-        item = (key, value)
-        i = 0
-        index = (self.__hash_fun(key) + i) % self.bin_count
-        while self.hash_table[index] is not None and self.hash_table[index] != DELETED:
-            i += 1
-            index = (self.__hash_fun(key) + i) % self.bin_count
-        self.hash_table[index] = item
-        self.__length += 1
-        self.rebuild(self.bin_count)
-        return str(item) + " inserted"
+        >>> open_hash.__setitem__(5, "FIVE")
+        >>> open_hash.__getitem__(5), open_hash.__len__()
+        ('FIVE', 1)
+        """
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        hashed = self.__hash_fun(key)
+        index, probes = self.__find(key, hashed)
+        if index >= 0:
+            self.hash_table[index] = (key, value, hashed)
+            event = "update"
+        else:
+            self.__place((key, value, hashed))
+            self.__length += 1
+            self.rebuild(self.bin_count)
+            event = "insert"
+        if stats is not None:
+            stats.record("set", clock() - started, probes, self)
+        if self.__on_event is not None:
+            self.__on_event(event, (key, value))
+
+    def update(self, items):
+        """
+        >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
+        >>> open_hash.update([(5, "five"), (6, "six"), (5, "FIVE")])
+        >>> open_hash.update({7: "seven"})
+        >>> open_hash.__len__(), open_hash.__getitem__(5)
+        (3, 'FIVE')
+        """
+        if hasattr(items, 'items'):
+            items = items.items()
+        elif not hasattr(items, '__len__'):
+            items = list(items)
+        self.__reserve(self.__length + len(items))
+        for key, value in items:
+            self.__setitem__(key, value)
+
+    @classmethod
+    def from_items(cls, items, **kwargs):
+        """
+        >>> open_hash = OpenAddressHashDict.from_items((key, str(key)) for key in range(1000))
+        >>> open_hash.__len__(), open_hash.bin_count, open_hash.__getitem__(999)
+        (1000, 1429, '999')
+        """
+        hash_dict = cls(**kwargs)
+        hash_dict.update(items)
+        return hash_dict
+
+    def items(self):
+        """
+        >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(1))
+        >>> open_hash.update({1: "one", 2: "two"})
+        >>> sorted(open_hash.items())
+        [(1, 'one'), (2, 'two')]
+        """
+        for entry in self.hash_table:
+            if entry is not None and entry is not DELETED:
+                yield entry[:2]
+
+    def dump(self, fileobj, chunk_size=4096):
+        """
+        Write a binary snapshot of the entries to `fileobj`.
+
+        >>> import io
+        >>> open_hash = OpenAddressHashDict.from_items((key, str(key)) for key in range(1000))
+        >>> snapshot = io.BytesIO()
+        >>> open_hash.dump(snapshot, chunk_size=300)
+        >>> restored = OpenAddressHashDict.load(io.BytesIO(snapshot.getvalue()))
+        >>> restored.__len__(), restored.bin_count, restored.__getitem__(999)
+        (1000, 1429, '999')
+        """
+        _dump_snapshot(fileobj, "open", self.__length, self.items(), chunk_size)
+
+    @classmethod
+    def load(cls, fileobj, **kwargs):
+        """Rebuild a dict written by dump(), presized for its entry count."""
+        count, chunks = _load_snapshot(fileobj, "open")
+        hash_dict = cls(**kwargs)
+        hash_dict.__reserve(count)
+        for chunk in chunks:
+            hash_dict.update(chunk)
+        return hash_dict
 
     def __delitem__(self, key):
         """
         >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> open_hash.__delitem__(10)
-        item with key: 10 not found
+        Traceback (most recent call last):
+        ...
+        KeyError: 10
         >>> open_hash.__delitem__(5)
-        item (5, 'five') with key: 5 deleted
-        """
-        i = 0
-        index = (self.__hash_fun(key) + i) % self.bin_count
-        item = self.hash_table[index]
-        while item is not None and item[0] != key:
-            i += 1
-            index = (self.__hash_fun(key) + i) % self.bin_count
-            item = self.hash_table[index]
-        if item is not None:
-            self.hash_table[index] = DELETED
+        """
+        self.pop(key)
+
+    def pop(self, key, default=_MISSING):
+        """
+        >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
+        >>> open_hash.__setitem__(5, "five")
+        >>> open_hash.pop(5)
+        'five'
+        >>> open_hash.pop(5, "gone")
+        'gone'
+        >>> open_hash.pop(5)
+        Traceback (most recent call last):
+        ...
+        KeyError: 5
+        """
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        hashed = self.__hash_fun(key)
+        index, probes = self.__find(key, hashed)
+        if index >= 0:
+            value = self.hash_table[index][1]
+            self.__remove(index)
             self.__length -= 1
-            print("item " + str(item) + " with key: " + str(key) + " deleted")
+            self.rebuild(self.__bin_count)
+        if stats is not None:
+            stats.record("pop", clock() - started, probes, self)
+        if index >= 0:
+            if self.__on_event is not None:
+                self.__on_event("delete", (key, value))
+            return value
+        if default is _MISSING:
+            raise KeyError(key)
+        return default
+
+    def __remove(self, index):
+        table = self.hash_table
+        bin_count = self.__bin_count
+        mask = self.__mask
+        following = index + 1 if index + 1 < bin_count else 0
+        if self.__robin_hood:
+            entry = table[following]
+            while entry is not None:
+                offset = following - entry[2]
+                if (offset & mask if mask is not None else offset % bin_count) == 0:
+                    break
+                table[index] = entry
+                index = following
+                following = following + 1 if following + 1 < bin_count else 0
+                entry = table[following]
+            table[index] = None
+        elif table[following] is None:
+            table[index] = None
+            index = index - 1 if index else bin_count - 1
+            while table[index] is DELETED:
+                table[index] = None
+                self.__tombstones -= 1
+                index = index - 1 if index else bin_count - 1
         else:
-            print ("item with key: " + str(key) + " not found")
+            table[index] = DELETED
+            self.__tombstones += 1
+
+    def get_many(self, keys, default=None):
+        """
+        Look up a batch of keys, returning a list of values aligned with
+        `keys` and `default` for missing ones. The batch is hashed in one pass.
+
+        >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(2))
+        >>> open_hash.update((key, str(key)) for key in range(5))
+        >>> open_hash.get_many([4, 0, 9, 4])
+        ['4', '0', None, '4']
+        """
+        keys, hashes = _hash_batch(self.__hash_fun, keys)
+        table = self.hash_table
+        values = [default] * len(keys)
+        for position, hashed in enumerate(hashes):
+            index = self.__find(keys[position], hashed)[0]
+            if index >= 0:
+                values[position] = table[index][1]
+        return values
+
+    def contains_many(self, keys):
+        """
+        >>> open_hash = OpenAddressHashDict()
+        >>> open_hash.update({1: None, 2: "two"})
+        >>> open_hash.contains_many([1, 2, 3])
+        [True, True, False]
+        """
+        return [value is not _MISSING for value in self.get_many(keys, _MISSING)]
 
     def __contains__(self, key):
         """
         >>> open_hash = OpenAddressHashDict(hashfunc=terrible_hash(10))
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> open_hash.__contains__(10)
         False
         >>> open_hash.__contains__(5)
         True
         """
-        value = self.__getitem__(key)
-        if value is not None:
-            return True
-        return False
+        stats = self.__stats
+        if stats is not None:
+            started = clock()
+        hashed = self.__hash_fun(key)
+        index, probes = self.__find(key, hashed)
+        if stats is not None:
+            elapsed = clock() - started
+            stats.record("contains", elapsed, probes, self)
+        return index >= 0
 
     def __len__(self):
         """
@@ -454,7 +1712,6 @@ class OpenAddressHashDict(object):
         >>> open_hash.__len__()
         0
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> open_hash.__len__()
         1
         """
@@ -464,7 +1721,6 @@ class OpenAddressHashDict(object):
         """
         >>> open_hash = OpenAddressHashDict(bin_count=2 ,hashfunc=terrible_hash(10))
         >>> open_hash.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> open_hash.display()
         0 | (5, 'five')
         -----------
@@ -474,260 +1730,1576 @@ class OpenAddressHashDict(object):
         for index in range(len(self.hash_table)):
             if self.hash_table[index] is None:
                 val = "Empty"
-            elif self.hash_table[index] == DELETED:
+            elif self.hash_table[index] is DELETED:
                 val = "Deleted"
             else:
-                val = str(self.hash_table[index])
+                val = str(self.hash_table[index][:2])
             print str(index) + " | " + val
             print "-----------"
 
 
-class BinaryTreeNode(object):
-    def __init__(self, data=None, left=None, right=None, parent=None):
-        super(BinaryTreeNode, self).__init__()
-        self.data = data
-        self.left = left
-        self.right = right
-        self.parent = parent
-
+_TYPED_MAGIC = "TOAHDICT"
+_TYPED_HEADER = struct.Struct("<8sQQQ8s8s")
+_EMPTY, _FULL, _TOMBSTONE = "\x00", "\x01", "\x02"
 
-class BinarySearchTreeDict(object):
-    def __init__(self):
-        super(BinarySearchTreeDict, self).__init__()
-        self.root = None
-        self.length = 0
-        self.l_height = 0
-        self.r_height = 0
 
-    @property
-    def height(self):
-        """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.height
-        -1
-        >>> binary_tree.__setitem__(1, "one")
-        "(1, 'one') inserted"
-        >>> binary_tree.height
-        0
+class TypedOpenAddressHashDict(object):
+    def __init__(self, bin_count=16, max_load=0.7, hashfunc=hash, key_format="q", value_format="q",
+                 tombstone_ratio=0.2, path=None, on_event=None):
         """
-        return self.__calculate_height(self.root)
+        Linear-probing hash dict for fixed-width keys and values, stored as a
+        header, one state byte per slot, then packed key and value arrays in a
+        single mmap. Formats are struct codes such as "q" (int64) or "d"
+        (double); bin counts are powers of two so home slots are masked.
 
-    def __calculate_height(self, b_tree):
-        if b_tree is None:
-            return -1
-        else:
-            return 1 + max(self.__calculate_height(b_tree.left), self.__calculate_height(b_tree.right))
+        Without `path` the mmap is anonymous and shared with processes forked
+        after it was created, so presize it with bin_count before forking as
+        a resize replaces the mapping. With `path` the table lives in that
+        file and can be reopened with open() without a load step.
 
-    def in_order_keys(self):
-        """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> binary_tree.__setitem__(3, "Three")
-        "(3, 'Three') inserted"
-        >>> binary_tree.__setitem__(7, "seven")
-        "(7, 'seven') inserted"
-        >>> binary_tree.in_order_keys()
-        In-order tree traversal keys: 3->5->7
+        >>> typed_hash = TypedOpenAddressHashDict(key_format="q", value_format="d")
+        >>> for key in range(100): typed_hash[key] = key / 2.0
+        >>> typed_hash.__len__(), typed_hash.bin_count, typed_hash[99], typed_hash[100]
+        (100, 256, 49.5, None)
+        >>> verbose_hash = TypedOpenAddressHashDict(on_event=print_event)
+        >>> verbose_hash.__setitem__(5, 50)
+        (5, 50) inserted
+        >>> verbose_hash.__delitem__(5)
+        (5, 50) deleted
         """
-        print "In-order tree traversal keys: " + "->".join([str(item[0]) for item in self.__in_order_print(self.root)])
+        super(TypedOpenAddressHashDict, self).__init__()
+        self.__setup(max_load, hashfunc, key_format, value_format, tombstone_ratio, path, on_event)
+        size = 1
+        while size < bin_count:
+            size <<= 1
+        self.__allocate(size)
 
-    def __in_order_print(self, b_tree):
-        if b_tree is None:
-            StopIteration()
-        else:
-            for data in self.__in_order_print(b_tree.left):
-                yield data
-            yield b_tree.data
-            for data in self.__in_order_print(b_tree.right):
-                yield data
+    def __setup(self, max_load, hashfunc, key_format, value_format, tombstone_ratio, path, on_event):
+        if not 0 < max_load < 1:
+            raise ValueError("max_load must be between 0 and 1 for open addressing")
+        self.__on_event = on_event
+        self.__max_load = max_load
+        self.__hash_fun = hashfunc
+        self.__tombstone_ratio = tombstone_ratio
+        self.__key = struct.Struct("<" + key_format)
+        self.__value = struct.Struct("<" + value_format)
+        self.__path = path
+        self.__buffer = None
 
-    def post_order_keys(self):
+    @classmethod
+    def open(cls, path, max_load=0.7, hashfunc=hash, tombstone_ratio=0.2, on_event=None):
         """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> binary_tree.__setitem__(3, "Three")
-        "(3, 'Three') inserted"
-        >>> binary_tree.__setitem__(7, "seven")
-        "(7, 'seven') inserted"
-        >>> binary_tree.post_order_keys()
-        Post-order tree traversal keys: 3->7->5
+        Map a table previously written to `path`. The formats, size and
+        contents come from the file; the other arguments are as for the
+        constructor.
+
+        >>> import os, tempfile
+        >>> path = os.path.join(tempfile.mkdtemp(), "table")
+        >>> typed_hash = TypedOpenAddressHashDict(path=path)
+        >>> typed_hash.update((key, key * key) for key in range(50))
+        >>> typed_hash.close()
+        >>> reopened = TypedOpenAddressHashDict.open(path)
+        >>> reopened.__len__(), reopened[7]
+        (50, 49)
+        >>> reopened.close()
+        >>> TypedOpenAddressHashDict.open(path, max_load=1.0)
+        Traceback (most recent call last):
+        ...
+        ValueError: max_load must be between 0 and 1 for open addressing
         """
-        print "Post-order tree traversal keys: " + "->".join(
-            [str(item[0]) for item in self.__post_order_print(self.root)])
+        with open(path, "rb") as table_file:
+            header = _TYPED_HEADER.unpack(table_file.read(_TYPED_HEADER.size))
+        if header[0] != _TYPED_MAGIC:
+            raise ValueError("%s is not a typed hash table file" % path)
+        typed_hash = cls.__new__(cls)
+        super(TypedOpenAddressHashDict, typed_hash).__init__()
+        typed_hash.__setup(max_load, hashfunc, header[4].rstrip("\x00"), header[5].rstrip("\x00"),
+                           tombstone_ratio, path, on_event)
+        typed_hash.__map(header[1])
+        typed_hash.__length, typed_hash.__tombstones = header[2], header[3]
+        return typed_hash
 
-    def __post_order_print(self, b_tree):
-        if b_tree is not None:
-            for data in self.__post_order_print(b_tree.left):
-                yield data
-            for data in self.__post_order_print(b_tree.right):
-                yield data
-            yield b_tree.data
+    def __map(self, bin_count):
+        self.__bin_count = bin_count
+        self.__mask = bin_count - 1
+        self.__states = _TYPED_HEADER.size
+        self.__keys = self.__states + bin_count
+        self.__values = self.__keys + bin_count * self.__key.size
+        size = self.__values + bin_count * self.__value.size
+        if self.__buffer is not None:
+            self.__buffer.close()
+        if self.__path is None:
+            self.__buffer = mmap.mmap(-1, size)
         else:
-            StopIteration()
+            mode = "r+b" if os.path.exists(self.__path) else "w+b"
+            with open(self.__path, mode) as table_file:
+                table_file.truncate(size)
+                self.__buffer = mmap.mmap(table_file.fileno(), size)
 
-    def pre_order_keys(self):
-        """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> binary_tree.__setitem__(3, "Three")
-        "(3, 'Three') inserted"
-        >>> binary_tree.__setitem__(7, "seven")
-        "(7, 'seven') inserted"
-        >>> binary_tree.pre_order_keys()
-        Pre-order tree traversal keys: 5->3->7
-        """
-        print "Pre-order tree traversal keys: " + "->".join(
-            [str(item[0]) for item in self.__pre_order_print(self.root)])
+    def __allocate(self, bin_count):
+        self.__map(bin_count)
+        self.__buffer[self.__states:self.__keys] = _EMPTY * bin_count
+        self.__length = 0
+        self.__tombstones = 0
+        self.__write_header()
 
-    def __pre_order_print(self, b_tree):
-        if b_tree is not None:
-            yield b_tree.data
-            for data in self.__pre_order_print(b_tree.left):
-                yield data
-            for data in self.__pre_order_print(b_tree.right):
-                yield data
-        else:
-            StopIteration()
+    def __write_header(self):
+        _TYPED_HEADER.pack_into(self.__buffer, 0, _TYPED_MAGIC, self.__bin_count, self.__length,
+                                self.__tombstones, self.__key.format[1:], self.__value.format[1:])
 
-    def items(self):
-        """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> binary_tree.__setitem__(3, "Three")
-        "(3, 'Three') inserted"
-        >>> binary_tree.__setitem__(7, "seven")
-        "(7, 'seven') inserted"
-        >>> binary_tree.items()
-        Values : Three -> five -> seven
-        """
-        print "Values : " + " -> ".join([str(item[1]) for item in self.__in_order_print(self.root)])
+    @property
+    def load_factor(self):
+        return float(self.__length) / self.__bin_count
+
+    @property
+    def bin_count(self):
+        return self.__bin_count
+
+    @property
+    def tombstones(self):
+        return self.__tombstones
+
+    @property
+    def nbytes(self):
+        """Size of the mapped table in bytes."""
+        return len(self.__buffer)
+
+    def rebuild(self, bincount):
+        if self.load_factor > self.__max_load:
+            self.__resize(bincount * 2)
+        elif (self.__tombstones > self.__tombstone_ratio * self.__bin_count or
+              self.__length + self.__tombstones > self.__max_load * self.__bin_count):
+            self.__resize(bincount)
+
+    def __resize(self, bin_count):
+        entries = list(self.items())
+        self.__allocate(bin_count)
+        for key, value in entries:
+            self.__place(key, value)
+        self.__length = len(entries)
+        self.__write_header()
+
+    def __find(self, key):
+        buffer_ = self.__buffer
+        states = self.__states
+        key_struct = self.__key
+        offset = self.__keys
+        key_size = key_struct.size
+        index = self.__hash_fun(key) & self.__mask
+        state = buffer_[states + index]
+        while state != _EMPTY:
+            if state == _FULL and key_struct.unpack_from(buffer_, offset + index * key_size)[0] == key:
+                return index
+            index = (index + 1) & self.__mask
+            state = buffer_[states + index]
+        return -1
+
+    def __place(self, key, value):
+        buffer_ = self.__buffer
+        states = self.__states
+        index = self.__hash_fun(key) & self.__mask
+        packed_key, packed_value = self.__key.pack(key), self.__value.pack(value)
+        while buffer_[states + index] == _FULL:
+            index = (index + 1) & self.__mask
+        offset = self.__keys + index * self.__key.size
+        buffer_[offset:offset + self.__key.size] = packed_key
+        offset = self.__values + index * self.__value.size
+        buffer_[offset:offset + self.__value.size] = packed_value
+        if buffer_[states + index] == _TOMBSTONE:
+            self.__tombstones -= 1
+        buffer_[states + index] = _FULL
 
     def __getitem__(self, key):
-        """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> binary_tree.__getitem__(5)
-        'five'
-        >>> binary_tree.__getitem__(10)
-        """
-        b_tree = self.root
-        while b_tree is not None:
-            if b_tree.data[0] == key:
-                return b_tree.data[1]
-            elif key < b_tree.data[0]:
-                b_tree = b_tree.left
-            else:
-                b_tree = b_tree.right
-        return None
+        index = self.__find(key)
+        if index < 0:
+            return None
+        return self.__value.unpack_from(self.__buffer, self.__values + index * self.__value.size)[0]
 
     def __setitem__(self, key, value):
         """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
+        >>> typed_hash = TypedOpenAddressHashDict()
+        >>> typed_hash.__setitem__(5, 50)
+        >>> typed_hash.__setitem__(5, 55)
+        >>> typed_hash.__getitem__(5), typed_hash.__len__()
+        (55, 1)
+        >>> typed_hash.__setitem__(2, "abc")
+        Traceback (most recent call last):
+        ...
+        error: cannot convert argument to integer
+        >>> typed_hash.__setitem__(2 ** 70, 1)
+        Traceback (most recent call last):
+        ...
+        error: integer out of range for 'q' format code
+        >>> typed_hash.__len__(), list(typed_hash.items())
+        (1, [(5, 55)])
         """
-        data = (key, value)
-        b_tree_node = BinaryTreeNode(data)
-        if self.root is None:
-            self.root = b_tree_node
-            self.length += 1
+        index = self.__find(key)
+        if index >= 0:
+            self.__value.pack_into(self.__buffer, self.__values + index * self.__value.size, value)
+            event = "update"
         else:
-            traverse = self.root
-            self.__insert_node(traverse, b_tree_node)
-        return str(data) + " inserted"
-
-    def __insert_node(self, traverse, b_tree_node):
-        if b_tree_node.data[0] < traverse.data[0]:
-            if traverse.left is None:
-                traverse.left = b_tree_node
-                b_tree_node.parent = traverse
-                self.length += 1
-            else:
-                self.__insert_node(traverse.left, b_tree_node)
+            self.__place(key, value)
+            self.__length += 1
+            self.rebuild(self.__bin_count)
+            event = "insert"
+        self.__write_header()
+        if self.__on_event is not None:
+            self.__on_event(event, (key, value))
+
+    def update(self, items):
+        if hasattr(items, 'items'):
+            items = items.items()
+        for key, value in items:
+            self.__setitem__(key, value)
+
+    def pop(self, key, default=_MISSING):
+        """
+        >>> typed_hash = TypedOpenAddressHashDict()
+        >>> for key in range(10): typed_hash[key] = key
+        >>> typed_hash.pop(3), typed_hash.pop(3, -1), typed_hash[4], typed_hash.tombstones
+        (3, -1, 4, 1)
+        >>> typed_hash.pop(3)
+        Traceback (most recent call last):
+        ...
+        KeyError: 3
+        """
+        index = self.__find(key)
+        if index < 0:
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        value = self.__value.unpack_from(self.__buffer, self.__values + index * self.__value.size)[0]
+        if self.__buffer[self.__states + ((index + 1) & self.__mask)] == _EMPTY:
+            self.__buffer[self.__states + index] = _EMPTY
         else:
-            if traverse.right is None:
-                traverse.right = b_tree_node
-                b_tree_node.parent = traverse
-                self.length += 1
-            else:
-                self.__insert_node(traverse.right, b_tree_node)
+            self.__buffer[self.__states + index] = _TOMBSTONE
+            self.__tombstones += 1
+        self.__length -= 1
+        self.rebuild(self.__bin_count)
+        self.__write_header()
+        if self.__on_event is not None:
+            self.__on_event("delete", (key, value))
+        return value
 
     def __delitem__(self, key):
+        self.pop(key)
+
+    def get_many(self, keys, default=None):
         """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> binary_tree.__delitem__(10)
-        key: 10 not found
-        >>> binary_tree.__delitem__(5)
-        Item: (5, 'five') with key: 5 deleted.
+        Look up a batch of keys. For an integer NumPy array of keys the probe
+        runs vectorized over the mapped slot arrays and a NumPy array of
+        values comes back, with `default` (0 when None) in missing positions;
+        use contains_many() for the hit mask. Other batches return a list.
+
+        >>> typed_hash = TypedOpenAddressHashDict()
+        >>> typed_hash.update((key, key * 10) for key in range(5))
+        >>> typed_hash.get_many([4, 0, 9])
+        [40, 0, None]
         """
-        self.__del_item_recursive(self.root, key)
+        if self.__vectorizable(keys):
+            slots, found = self.__probe_many(keys)
+            stored = numpy.frombuffer(self.__buffer, dtype=_packed_dtype(self.__value),
+                                      count=self.__bin_count, offset=self.__values)
+            values = numpy.empty(len(keys), dtype=stored.dtype)
+            values.fill(0 if default is None else default)
+            values[found] = stored[slots[found]]
+            return values
+        values = []
+        for key in keys:
+            index = self.__find(key)
+            values.append(self.__value.unpack_from(self.__buffer, self.__values + index * self.__value.size)[0]
+                          if index >= 0 else default)
+        return values
 
-    def __del_item_recursive(self, b_tree, key):
-        if b_tree is None:
-            print "key: " + str(key) + " not found"
-            return b_tree
-        if key < b_tree.data[0]:
-            b_tree.left = self.__del_item_recursive(b_tree.left, key)
-        elif key > b_tree.data[0]:
-            b_tree.right = self.__del_item_recursive(b_tree.right, key)
-        else:
-            if b_tree.left is None and b_tree.right is None:
-                print "Item: " + str(b_tree.data) + " with key: " + str(key) + " deleted."
-                b_tree = None
-            elif b_tree.left is not None and b_tree.right is None:
-                temp = b_tree
-                b_tree = b_tree.left
-                print "Item: " + str(temp.data) + " with key: " + str(key) + " deleted."
-                del temp
-            elif b_tree.left is not None and b_tree.right is None:
-                temp = b_tree
-                b_tree = b_tree.right
-                print "Item: " + str(temp.data) + " with key: " + str(key) + " deleted."
-                del temp
-            else:
-                print "Item: " + str(b_tree.data) + " with key: " + str(key) + " deleted."
-                curr = self.__min_value(b_tree.right)
-                b_tree.data = curr.data
-                if b_tree.right == curr:
-                    b_tree.right = None
-                else:
-                    curr.parent.left = curr.right
-        return b_tree
+    def contains_many(self, keys):
+        """
+        >>> typed_hash = TypedOpenAddressHashDict()
+        >>> typed_hash.update({1: 10, 2: 20})
+        >>> typed_hash.contains_many([1, 2, 3])
+        [True, True, False]
+        >>> wide_hash = TypedOpenAddressHashDict(key_format="Q")
+        >>> wide_hash[2 ** 60 + 16] = 7
+        >>> keys = [2 ** 60, 2 ** 60 + 16] if numpy is None else numpy.array([2 ** 60, 2 ** 60 + 16])
+        >>> list(wide_hash.contains_many(keys)), list(wide_hash.get_many(keys))
+        ([False, True], [None, 7])
+        """
+        if self.__vectorizable(keys):
+            return self.__probe_many(keys)[1]
+        return [self.__find(key) >= 0 for key in keys]
 
-    def __min_value(self, b_tree):
-        if b_tree.left is None:
-            return b_tree
-        else:
-            return self.__min_value(b_tree.left)
+    def __vectorizable(self, keys):
+        # Only probe vectorized when the batch already has the stored key
+        # dtype; comparing mixed integer dtypes promotes both to float64.
+        return (_vectorizable(self.__hash_fun, keys) and self.__key.format[1:] in "bBhHiIlLqQ" and
+                keys.dtype == _packed_dtype(self.__key))
+
+    def __probe_many(self, keys):
+        # Every key advances one slot per pass until it hits its key or an
+        # empty slot, so the number of passes is the longest probe sequence.
+        states = numpy.frombuffer(self.__buffer, dtype=numpy.uint8, count=self.__bin_count,
+                                  offset=self.__states)
+        stored = numpy.frombuffer(self.__buffer, dtype=_packed_dtype(self.__key),
+                                  count=self.__bin_count, offset=self.__keys)
+        hashes = keys.astype(numpy.int64)
+        hashes[hashes == -1] = -2
+        slots = hashes & self.__mask
+        found = numpy.zeros(len(keys), dtype=bool)
+        active = numpy.arange(len(keys))
+        while len(active):
+            slot = slots[active]
+            state = states[slot]
+            hit = (state == ord(_FULL)) & (stored[slot] == keys[active])
+            found[active[hit]] = True
+            active = active[~hit & (state != ord(_EMPTY))]
+            slots[active] = (slots[active] + 1) & self.__mask
+        return slots, found
 
     def __contains__(self, key):
+        return self.__find(key) >= 0
+
+    def __len__(self):
+        return self.__length
+
+    def items(self):
         """
-        >>> binary_tree = BinarySearchTreeDict()
-        >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
-        >>> binary_tree.__contains__(1)
-        False
-        >>> binary_tree.__contains__(5)
-        True
+        >>> typed_hash = TypedOpenAddressHashDict()
+        >>> typed_hash.update({1: 10, 2: 20})
+        >>> sorted(typed_hash.items())
+        [(1, 10), (2, 20)]
         """
-        return self.__contains_key(self.root, key)
+        buffer_ = self.__buffer
+        for index in xrange(self.__bin_count):
+            if buffer_[self.__states + index] == _FULL:
+                yield (self.__key.unpack_from(buffer_, self.__keys + index * self.__key.size)[0],
+                       self.__value.unpack_from(buffer_, self.__values + index * self.__value.size)[0])
 
-    def __contains_key(self, b_tree, key):
-        if b_tree is None:
+    def flush(self):
+        self.__buffer.flush()
+
+    def close(self):
+        self.__buffer.close()
+
+
+_MASK64 = (1 << 64) - 1
+
+
+def _shard_index(hashed, shard_count):
+    # Fibonacci hashing: the top 32 bits of the 64-bit product depend on every
+    # bit of the hash, and scaling them by shard_count picks the shard from
+    # those top bits, so the keys of one shard still spread over all of that
+    # shard's bins.
+    return ((((hashed * 0x9E3779B97F4A7C15) & _MASK64) >> 32) * shard_count) >> 32
+
+
+class LRUCacheDict(object):
+    def __init__(self, max_entries=None, max_bytes=None, ttl=None, sizeof=sys.getsizeof, timer=clock,
+                 compact=False, on_event=None, **kwargs):
+        """
+        Least-recently-used cache: a ChainedHashDict maps each key to its node
+        in a DoublyLinkedList kept in recency order, so get, put and evict are
+        all O(1). Entries are evicted from the cold end once there are more
+        than `max_entries` of them or their keys and values, as measured by
+        `sizeof`, exceed `max_bytes`. Entries older than `ttl` seconds (or the
+        per-entry ttl given to put()) read as missing. Remaining keyword
+        arguments go to the ChainedHashDict.
+
+        >>> cache = LRUCacheDict(max_entries=2)
+        >>> cache["a"] = 1
+        >>> cache["b"] = 2
+        >>> cache["a"]
+        1
+        >>> cache["c"] = 3
+        >>> cache["b"], sorted(cache.keys()), cache.__len__()
+        (None, ['a', 'c'], 2)
+        >>> cache.hits, cache.misses, cache.evictions
+        (1, 1, 1)
+        >>> verbose_cache = LRUCacheDict(max_entries=1, on_event=print_event)
+        >>> verbose_cache.__setitem__(5, "five")
+        (5, 'five') inserted
+        >>> verbose_cache.__setitem__(6, "six")
+        (6, 'six') inserted
+        (5, 'five') evicted
+        """
+        super(LRUCacheDict, self).__init__()
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.__sizeof = sizeof
+        self.__timer = timer
+        self.__on_event = on_event
+        self.__map = ChainedHashDict(compact=compact, **kwargs)
+        self.__recency = DoublyLinkedList(compact=compact)
+        self.__node_class = self.__recency.node_class
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def __expired(self, node):
+        expires = node.item[2]
+        return expires is not None and self.__timer() >= expires
+
+    def __drop(self, node):
+        self.__recency.unlink(node)
+        self.__map.pop(node.item[0])
+        self.bytes -= node.item[3]
+
+    def get(self, key, default=None):
+        """
+        >>> now = [0.0]
+        >>> cache = LRUCacheDict(ttl=10, timer=lambda: now[0])
+        >>> cache.put("a", 1)
+        >>> cache.put("b", 2, ttl=100)
+        >>> now[0] = 50.0
+        >>> cache.get("a", "gone"), cache.get("b"), cache.expirations
+        ('gone', 2, 1)
+        """
+        node = self.__map[key]
+        if node is None:
+            self.misses += 1
+            return default
+        if self.__expired(node):
+            self.__drop(node)
+            self.expirations += 1
+            self.misses += 1
+            return default
+        self.__recency.move_to_end(node)
+        self.hits += 1
+        return node.item[1]
+
+    __getitem__ = get
+
+    def put(self, key, value, ttl=None):
+        if ttl is None:
+            ttl = self.ttl
+        expires = None if ttl is None else self.__timer() + ttl
+        size = self.__sizeof(key) + self.__sizeof(value) if self.max_bytes is not None else 0
+        node = self.__map[key]
+        if node is not None:
+            self.bytes += size - node.item[3]
+            node.item = (key, value, expires, size)
+            self.__recency.move_to_end(node)
+            event = "update"
+        else:
+            node = self.__node_class((key, value, expires, size))
+            self.__recency.append_node(node)
+            self.__map[key] = node
+            self.bytes += size
+            event = "insert"
+        if self.__on_event is not None:
+            self.__on_event(event, (key, value))
+        self.__evict()
+
+    def __setitem__(self, key, value):
+        self.put(key, value)
+
+    def __evict(self):
+        recency = self.__recency
+        while recency.head is not None and (
+                self.max_entries is not None and len(recency) > self.max_entries or
+                self.max_bytes is not None and self.bytes > self.max_bytes):
+            node = recency.head
+            self.__drop(node)
+            self.evictions += 1
+            if self.__on_event is not None:
+                self.__on_event("evict", node.item[:2])
+
+    def pop(self, key, default=_MISSING):
+        """
+        >>> cache = LRUCacheDict(max_bytes=10 ** 6)
+        >>> cache.put("a", "x" * 100)
+        >>> cache.bytes > 100, len(cache.pop("a")), cache.bytes
+        (True, 100, 0)
+        >>> cache.pop("a")
+        Traceback (most recent call last):
+        ...
+        KeyError: 'a'
+        """
+        node = self.__map[key]
+        if node is None or self.__expired(node):
+            if node is not None:
+                self.__drop(node)
+            if default is _MISSING:
+                raise KeyError(key)
+            return default
+        self.__drop(node)
+        if self.__on_event is not None:
+            self.__on_event("delete", node.item[:2])
+        return node.item[1]
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def __contains__(self, key):
+        """Membership test that neither refreshes recency nor counts as a hit."""
+        node = self.__map[key]
+        return node is not None and not self.__expired(node)
+
+    def __len__(self):
+        return len(self.__recency)
+
+    def keys(self):
+        """Keys from least to most recently used, including expired ones not yet dropped."""
+        node = self.__recency.head
+        while node is not None:
+            yield node.item[0]
+            node = node.next
+
+
+class BloomFilter(object):
+    def __init__(self, capacity=1024, error_rate=0.01, hashfunc=hash):
+        """
+        Bloom filter sized so that holding `capacity` keys gives roughly
+        `error_rate` false positives; there are never false negatives.
+
+        >>> bloom = BloomFilter(capacity=1000, error_rate=0.01)
+        >>> for key in range(1000): bloom.add(key)
+        >>> all(key in bloom for key in range(1000))
+        True
+        >>> sum(key in bloom for key in range(1000, 11000)) < 200
+        True
+        >>> bloom.bit_count, bloom.hash_count, bloom.__len__()
+        (9586, 7, 1000)
+        """
+        super(BloomFilter, self).__init__()
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.__hash_fun = hashfunc
+        self.bit_count = max(8, int(math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)))
+        self.hash_count = max(1, int(round(float(self.bit_count) / capacity * math.log(2))))
+        self.__bits = bytearray((self.bit_count + 7) // 8)
+        self.__length = 0
+
+    @classmethod
+    def from_keys(cls, keys, error_rate=0.01, hashfunc=hash, capacity=None):
+        """
+        >>> bloom = BloomFilter.from_keys(range(100))
+        >>> bloom.capacity, 42 in bloom
+        (100, True)
+        """
+        if not hasattr(keys, '__len__'):
+            keys = list(keys)
+        bloom = cls(capacity or max(len(keys), 1), error_rate, hashfunc)
+        for key in keys:
+            bloom.add(key)
+        return bloom
+
+    def __start(self, key):
+        # Kirsch-Mitzenmacher double hashing over a 64-bit finalizer of the
+        # key's hash, so consecutive integer keys still scatter.
+        mixed = self.__hash_fun(key) & _MASK64
+        mixed = ((mixed ^ (mixed >> 33)) * 0xff51afd7ed558ccd) & _MASK64
+        mixed = ((mixed ^ (mixed >> 33)) * 0xc4ceb9fe1a85ec53) & _MASK64
+        mixed ^= mixed >> 33
+        return (mixed & 0xffffffff) % self.bit_count, ((mixed >> 32) | 1) % self.bit_count
+
+    def add(self, key):
+        bits = self.__bits
+        bit_count = self.bit_count
+        position, step = self.__start(key)
+        for _ in xrange(self.hash_count):
+            bits[position >> 3] |= 1 << (position & 7)
+            position += step
+            if position >= bit_count:
+                position -= bit_count
+        self.__length += 1
+
+    def __contains__(self, key):
+        bits = self.__bits
+        bit_count = self.bit_count
+        position, step = self.__start(key)
+        for _ in xrange(self.hash_count):
+            if not bits[position >> 3] & (1 << (position & 7)):
+                return False
+            position += step
+            if position >= bit_count:
+                position -= bit_count
+        return True
+
+    def __len__(self):
+        return self.__length
+
+    @property
+    def false_positive_rate(self):
+        """Expected false-positive rate for the keys added so far."""
+        return (1 - math.exp(-float(self.hash_count) * self.__length / self.bit_count)) ** self.hash_count
+
+
+class FilteredDict(object):
+    def __init__(self, table, bloom_filter=None, error_rate=0.01):
+        """
+        Put a BloomFilter in front of any of the dict classes so lookups of
+        keys the filter has never seen return without touching the table.
+        The filter is built from the table's current keys unless one is
+        given, and learns every key set through the wrapper; deleted keys
+        stay in it and only cost a table lookup. Mutate the table only
+        through the wrapper.
+
+        >>> tree = BinarySearchTreeDict.from_sorted((key, str(key)) for key in range(100))
+        >>> filtered = FilteredDict(tree)
+        >>> filtered[5], filtered[500], 500 in filtered
+        ('5', None, False)
+        >>> filtered[500] = "five hundred"
+        >>> filtered[500], filtered.__len__(), filtered.filtered
+        ('five hundred', 101, 2)
+        """
+        super(FilteredDict, self).__init__()
+        self.table = table
+        if bloom_filter is None:
+            bloom_filter = BloomFilter.from_keys([key for key, _ in table.items()], error_rate,
+                                                 capacity=max(2 * len(table), 1024))
+        self.bloom_filter = bloom_filter
+        self.filtered = 0
+
+    def __getitem__(self, key):
+        if key not in self.bloom_filter:
+            self.filtered += 1
+            return None
+        return self.table[key]
+
+    def __contains__(self, key):
+        if key not in self.bloom_filter:
+            self.filtered += 1
             return False
-        elif key < b_tree.data[0]:
-            return self.__contains_key(b_tree.left, key)
-        elif key > b_tree.data[0]:
-            return self.__contains_key(b_tree.right, key)
+        return key in self.table
+
+    def __setitem__(self, key, value):
+        self.bloom_filter.add(key)
+        self.table[key] = value
+
+    def __delitem__(self, key):
+        del self.table[key]
+
+    def __len__(self):
+        return len(self.table)
+
+
+class ReadWriteLock(object):
+    def __init__(self):
+        """
+        Many concurrent readers or one writer; waiting writers are
+        preferred so a steady read load cannot starve them.
+
+        >>> lock = ReadWriteLock()
+        >>> lock.acquire_read(); lock.acquire_read()
+        >>> lock.readers
+        2
+        >>> lock.release_read(); lock.release_read()
+        >>> lock.acquire_write(); lock.release_write()
+        """
+        super(ReadWriteLock, self).__init__()
+        self.__condition = threading.Condition(threading.Lock())
+        self.readers = 0
+        self.__writing = False
+        self.__waiting_writers = 0
+
+    def acquire_read(self):
+        with self.__condition:
+            while self.__writing or self.__waiting_writers:
+                self.__condition.wait()
+            self.readers += 1
+
+    def release_read(self):
+        with self.__condition:
+            self.readers -= 1
+            if self.readers == 0:
+                self.__condition.notify_all()
+
+    def acquire_write(self):
+        with self.__condition:
+            self.__waiting_writers += 1
+            while self.__writing or self.readers:
+                self.__condition.wait()
+            self.__waiting_writers -= 1
+            self.__writing = True
+
+    def release_write(self):
+        with self.__condition:
+            self.__writing = False
+            self.__condition.notify_all()
+
+
+class ConcurrentHashDict(object):
+    def __init__(self, shard_count=16, hashfunc=hash, on_event=None, **kwargs):
+        """
+        Thread-safe dict made of `shard_count` ChainedHashDict shards, each
+        guarded by its own ReadWriteLock. Readers never block each other and
+        a resize only holds the write lock of the shard that is growing.
+        Remaining keyword arguments are passed to every shard.
+
+        >>> import threading
+        >>> concurrent_hash = ConcurrentHashDict(shard_count=4, incremental=True)
+        >>> def writer(offset):
+        ...     for key in range(offset, 1000, 4): concurrent_hash[key] = str(key)
+        >>> threads = [threading.Thread(target=writer, args=(offset,)) for offset in range(4)]
+        >>> for thread in threads: thread.start()
+        >>> for thread in threads: thread.join()
+        >>> concurrent_hash.__len__(), concurrent_hash[999], 1000 in concurrent_hash
+        (1000, '999', False)
+        >>> verbose_hash = ConcurrentHashDict(on_event=print_event)
+        >>> verbose_hash.__setitem__(5, "five")
+        (5, 'five') inserted
+        >>> verbose_hash.__delitem__(5)
+        (5, 'five') deleted
+        """
+        super(ConcurrentHashDict, self).__init__()
+        self.__hash_fun = hashfunc
+        self.__shard_count = shard_count
+        self.shards = [ChainedHashDict(hashfunc=hashfunc, on_event=on_event, **kwargs) for _ in range(shard_count)]
+        self.__locks = [ReadWriteLock() for _ in range(shard_count)]
+
+    def __shard(self, key):
+        index = _shard_index(self.__hash_fun(key), self.__shard_count)
+        return self.shards[index], self.__locks[index]
+
+    def __getitem__(self, key):
+        """
+        >>> concurrent_hash = ConcurrentHashDict()
+        >>> concurrent_hash.__setitem__(5, "five")
+        >>> concurrent_hash.__getitem__(5), concurrent_hash.__getitem__(6)
+        ('five', None)
+        """
+        shard, lock = self.__shard(key)
+        lock.acquire_read()
+        try:
+            return shard[key]
+        finally:
+            lock.release_read()
+
+    def __setitem__(self, key, value):
+        shard, lock = self.__shard(key)
+        lock.acquire_write()
+        try:
+            shard[key] = value
+        finally:
+            lock.release_write()
+
+    def setdefault(self, key, default=None):
+        """
+        >>> concurrent_hash = ConcurrentHashDict()
+        >>> concurrent_hash.setdefault(5, []).append("five")
+        >>> concurrent_hash.setdefault(5, [])
+        ['five']
+        """
+        shard, lock = self.__shard(key)
+        lock.acquire_write()
+        try:
+            return shard.setdefault(key, default)
+        finally:
+            lock.release_write()
+
+    def pop(self, key, default=_MISSING):
+        """
+        >>> concurrent_hash = ConcurrentHashDict()
+        >>> concurrent_hash.__setitem__(5, "five")
+        >>> concurrent_hash.pop(5), concurrent_hash.pop(5, "gone")
+        ('five', 'gone')
+        >>> concurrent_hash.pop(5)
+        Traceback (most recent call last):
+        ...
+        KeyError: 5
+        """
+        shard, lock = self.__shard(key)
+        lock.acquire_write()
+        try:
+            return shard.pop(key, default)
+        finally:
+            lock.release_write()
+
+    def update(self, items):
+        if hasattr(items, 'items'):
+            items = items.items()
+        for key, value in items:
+            self.__setitem__(key, value)
+
+    def __delitem__(self, key):
+        self.pop(key)
+
+    def __contains__(self, key):
+        shard, lock = self.__shard(key)
+        lock.acquire_read()
+        try:
+            return key in shard
+        finally:
+            lock.release_read()
+
+    def __len__(self):
+        """Sum of the shard sizes; each shard is read under its own lock."""
+        length = 0
+        for shard, lock in zip(self.shards, self.__locks):
+            lock.acquire_read()
+            try:
+                length += len(shard)
+            finally:
+                lock.release_read()
+        return length
+
+
+def _shard_worker(connection, kwargs):
+    open_hash = OpenAddressHashDict(**kwargs)
+    while True:
+        command, payload = connection.recv()
+        if command == "set_many":
+            open_hash.update(payload)
+            connection.send(None)
+        elif command == "get_many":
+            connection.send([open_hash[key] for key in payload])
+        elif command == "pop_many":
+            connection.send([open_hash.pop(key, None) for key in payload])
+        elif command == "len":
+            connection.send(len(open_hash))
+        else:
+            connection.close()
+            return
+
+
+class ProcessShardedHashDict(object):
+    def __init__(self, process_count=None, hashfunc=hash, **kwargs):
+        """
+        Front-end over `process_count` worker processes, each owning an
+        OpenAddressHashDict for the keys that hash to it. Batches are split
+        per shard and sent down every pipe before any reply is read, so the
+        workers probe their tables in parallel. Keys and values cross the
+        pipes pickled; remaining keyword arguments go to every worker table.
+
+        >>> sharded_hash = ProcessShardedHashDict(process_count=3)
+        >>> sharded_hash.set_many((key, str(key)) for key in range(1000))
+        >>> sharded_hash.get_many([0, 999, 1000])
+        ['0', '999', None]
+        >>> sharded_hash.__len__(), sharded_hash.pop_many([5, 5])
+        (1000, ['5', None])
+        >>> sharded_hash.set_many([(0, "zero"), (3, lambda: None)])
+        Traceback (most recent call last):
+        ...
+        PicklingError: Can't pickle <type 'function'>: attribute lookup __builtin__.function failed
+        >>> sharded_hash.get_many([0, 2])
+        ['0', '2']
+        >>> sharded_hash.close()
+        """
+        super(ProcessShardedHashDict, self).__init__()
+        if process_count is None:
+            process_count = multiprocessing.cpu_count()
+        self.__hash_fun = hashfunc
+        self.__connections = []
+        self.__processes = []
+        kwargs['hashfunc'] = hashfunc
+        for _ in range(process_count):
+            parent, child = multiprocessing.Pipe()
+            process = multiprocessing.Process(target=_shard_worker, args=(child, kwargs))
+            process.daemon = True
+            process.start()
+            child.close()
+            self.__connections.append(parent)
+            self.__processes.append(process)
+
+    def __split(self, keys, entries):
+        shard_count = len(self.__connections)
+        batches = [[] for _ in range(shard_count)]
+        positions = [[] for _ in range(shard_count)]
+        for position, (key, entry) in enumerate(zip(keys, entries)):
+            index = _shard_index(self.__hash_fun(key), shard_count)
+            batches[index].append(entry)
+            positions[index].append(position)
+        return batches, positions
+
+    def __scatter(self, command, batches):
+        # Pickle every batch before sending any, so an unpicklable key or
+        # value fails the call without leaving replies queued in the pipes.
+        payloads = [pickle.dumps((command, batch), pickle.HIGHEST_PROTOCOL) if batch else None
+                    for batch in batches]
+        sent = []
+        for connection, payload in zip(self.__connections, payloads):
+            if payload is not None:
+                connection.send_bytes(payload)
+                sent.append(connection)
+        return [connection.recv() for connection in sent]
+
+    def __gather(self, command, keys):
+        if not hasattr(keys, '__len__'):
+            keys = list(keys)
+        batches, positions = self.__split(keys, keys)
+        values = [None] * len(keys)
+        replies = iter(self.__scatter(command, batches))
+        for shard_positions in positions:
+            if shard_positions:
+                for position, value in zip(shard_positions, next(replies)):
+                    values[position] = value
+        return values
+
+    def set_many(self, items):
+        if hasattr(items, 'items'):
+            items = items.items()
+        elif not hasattr(items, '__len__'):
+            items = list(items)
+        self.__scatter("set_many", self.__split([key for key, _ in items], items)[0])
+
+    def get_many(self, keys):
+        return self.__gather("get_many", keys)
+
+    def pop_many(self, keys):
+        """Remove `keys`, returning their values or None for missing keys."""
+        return self.__gather("pop_many", keys)
+
+    def __getitem__(self, key):
+        return self.get_many([key])[0]
+
+    def __setitem__(self, key, value):
+        self.set_many([(key, value)])
+
+    def __len__(self):
+        for connection in self.__connections:
+            connection.send(("len", None))
+        return sum(connection.recv() for connection in self.__connections)
+
+    def close(self):
+        for connection in self.__connections:
+            connection.send(("close", None))
+            connection.close()
+        for process in self.__processes:
+            process.join()
+        self.__connections = []
+        self.__processes = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BinaryTreeNode(object):
+    def __init__(self, data=None, left=None, right=None, parent=None):
+        super(BinaryTreeNode, self).__init__()
+        self.data = data
+        self.left = left
+        self.right = right
+        self.parent = parent
+        self.height = 0
+        self.size = 1
+
+
+class CompactBinaryTreeNode(object):
+    __slots__ = ('data', 'left', 'right', 'parent', 'height', 'size')
+
+    def __init__(self, data=None, left=None, right=None, parent=None):
+        self.data = data
+        self.left = left
+        self.right = right
+        self.parent = parent
+        self.height = 0
+        self.size = 1
+
+
+class BinarySearchTreeDict(object):
+    def __init__(self, compact=False, balanced=False, on_event=None):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> compact_tree = BinarySearchTreeDict(compact=True)
+        >>> avl_tree = BinarySearchTreeDict(balanced=True)
+        >>> for key in range(1000): avl_tree[key] = str(key)
+        >>> avl_tree.root.height, avl_tree.root.data
+        (9, (511, '511'))
+        >>> verbose_tree = BinarySearchTreeDict(on_event=print_event)
+        >>> verbose_tree.__setitem__(5, "five")
+        (5, 'five') inserted
+        >>> verbose_tree.__setitem__(5, "FIVE")
+        (5, 'FIVE') updated
+        >>> verbose_tree.__delitem__(5)
+        (5, 'FIVE') deleted
+        """
+        super(BinarySearchTreeDict, self).__init__()
+        self.__on_event = on_event
+        self.__node_class = CompactBinaryTreeNode if compact else BinaryTreeNode
+        self.__balanced = balanced
+        self.root = None
+        self.length = 0
+
+    @property
+    def height(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.height
+        -1
+        >>> binary_tree.__setitem__(1, "one")
+        >>> binary_tree.height
+        0
+        """
+        return self.__node_height(self.root)
+
+    def stats(self, samples=256):
+        """
+        Height, size and root balance from the cached node metadata, plus a
+        depth histogram estimated from `samples` nodes picked by rank.
+
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in (5, 3, 7, 1, 0): binary_tree[key] = str(key)
+        >>> stats = binary_tree.stats()
+        >>> stats['size'], stats['height'], stats['min_height'], stats['balance']
+        (5, 3, 2, 2)
+        >>> sorted(stats['depth_histogram'].items())
+        [(0, 1.0), (1, 2.0), (2, 1.0), (3, 1.0)]
+        """
+        size = self.length
+        sample_count = min(samples, size)
+        histogram = {}
+        for index in random.sample(xrange(size), sample_count) if sample_count < size else xrange(size):
+            depth = self.__select_node(index)[1]
+            histogram[depth] = histogram.get(depth, 0) + 1
+        scale = float(size) / sample_count if sample_count else 0.0
+        root = self.root
+        return {
+            'size': size,
+            'height': self.__node_height(root),
+            'min_height': size.bit_length() - 1,
+            'balance': 0 if root is None else self.__node_height(root.left) - self.__node_height(root.right),
+            'samples': sample_count,
+            'depth_histogram': dict((depth, count * scale) for depth, count in histogram.items()),
+        }
+
+    def in_order_keys(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__setitem__(3, "Three")
+        >>> binary_tree.__setitem__(7, "seven")
+        >>> list(binary_tree.in_order_keys())
+        [3, 5, 7]
+        """
+        return self.__iter__()
+
+    def __in_order_print(self, b_tree):
+        stack = []
+        while stack or b_tree is not None:
+            while b_tree is not None:
+                stack.append(b_tree)
+                b_tree = b_tree.left
+            b_tree = stack.pop()
+            yield b_tree.data
+            b_tree = b_tree.right
+
+    def __reverse_order_print(self, b_tree):
+        stack = []
+        while stack or b_tree is not None:
+            while b_tree is not None:
+                stack.append(b_tree)
+                b_tree = b_tree.right
+            b_tree = stack.pop()
+            yield b_tree.data
+            b_tree = b_tree.left
+
+    def post_order_keys(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__setitem__(3, "Three")
+        >>> binary_tree.__setitem__(7, "seven")
+        >>> list(binary_tree.post_order_keys())
+        [3, 7, 5]
+        """
+        for data in self.__post_order_print(self.root):
+            yield data[0]
+
+    def __post_order_print(self, b_tree):
+        stack = []
+        last = None
+        while stack or b_tree is not None:
+            if b_tree is not None:
+                stack.append(b_tree)
+                b_tree = b_tree.left
+            else:
+                top = stack[-1]
+                if top.right is not None and top.right is not last:
+                    b_tree = top.right
+                else:
+                    yield top.data
+                    last = stack.pop()
+
+    def pre_order_keys(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__setitem__(3, "Three")
+        >>> binary_tree.__setitem__(7, "seven")
+        >>> list(binary_tree.pre_order_keys())
+        [5, 3, 7]
+        """
+        for data in self.__pre_order_print(self.root):
+            yield data[0]
+
+    def __pre_order_print(self, b_tree):
+        stack = [b_tree] if b_tree is not None else []
+        while stack:
+            b_tree = stack.pop()
+            yield b_tree.data
+            if b_tree.right is not None:
+                stack.append(b_tree.right)
+            if b_tree.left is not None:
+                stack.append(b_tree.left)
+
+    def items(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__setitem__(3, "Three")
+        >>> binary_tree.__setitem__(7, "seven")
+        >>> list(binary_tree.items())
+        [(3, 'Three'), (5, 'five'), (7, 'seven')]
+        """
+        return self.__in_order_print(self.root)
+
+    def __iter__(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in (5, 3, 7): binary_tree[key] = str(key)
+        >>> list(binary_tree)
+        [3, 5, 7]
+        """
+        for data in self.__in_order_print(self.root):
+            yield data[0]
+
+    def keys(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in (5, 3, 7): binary_tree[key] = str(key)
+        >>> list(binary_tree.keys())
+        [3, 5, 7]
+        """
+        return self.__iter__()
+
+    def values(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in (5, 3, 7): binary_tree[key] = str(key)
+        >>> list(binary_tree.values())
+        ['3', '5', '7']
+        """
+        for data in self.__in_order_print(self.root):
+            yield data[1]
+
+    def reversed(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in (5, 3, 7): binary_tree[key] = str(key)
+        >>> list(binary_tree.reversed())
+        [7, 5, 3]
+        >>> list(reversed(binary_tree))
+        [7, 5, 3]
+        """
+        for data in self.__reverse_order_print(self.root):
+            yield data[0]
+
+    __reversed__ = reversed
+
+    @classmethod
+    def from_sorted(cls, items, **kwargs):
+        """
+        >>> binary_tree = BinarySearchTreeDict.from_sorted((key, str(key)) for key in range(7))
+        >>> binary_tree.root.data, binary_tree.height, binary_tree.__len__()
+        ((3, '3'), 2, 7)
+        >>> BinarySearchTreeDict.from_sorted([(2, "two"), (1, "one")])
+        Traceback (most recent call last):
+        ...
+        ValueError: keys must be strictly increasing
+        """
+        tree = cls(**kwargs)
+        tree.__load_sorted(list(items))
+        return tree
+
+    def dump(self, fileobj, chunk_size=4096):
+        """
+        Write a binary snapshot of the entries to `fileobj` in key order.
+
+        >>> import io
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in range(100): binary_tree[key] = str(key)
+        >>> snapshot = io.BytesIO()
+        >>> binary_tree.dump(snapshot, chunk_size=30)
+        >>> restored = BinarySearchTreeDict.load(io.BytesIO(snapshot.getvalue()))
+        >>> restored.__len__(), restored.height, restored.__getitem__(99)
+        (100, 6, '99')
+        """
+        _dump_snapshot(fileobj, "tree", self.length, self.items(), chunk_size)
+
+    @classmethod
+    def load(cls, fileobj, **kwargs):
+        """Rebuild a tree written by dump(); it comes back balanced in O(n)."""
+        count, chunks = _load_snapshot(fileobj, "tree")
+        items = []
+        for chunk in chunks:
+            items.extend(chunk)
+        return cls.from_sorted(items, **kwargs)
+
+    def merge(self, other):
+        """
+        >>> binary_tree = BinarySearchTreeDict.from_sorted([(1, "one"), (3, "three"), (5, "five")])
+        >>> other = BinarySearchTreeDict.from_sorted([(2, "two"), (3, "THREE"), (6, "six")])
+        >>> binary_tree.merge(other)
+        >>> list(binary_tree.items())
+        [(1, 'one'), (2, 'two'), (3, 'THREE'), (5, 'five'), (6, 'six')]
+        >>> binary_tree.height
+        2
+        """
+        merged = []
+        mine = self.__in_order_print(self.root)
+        theirs = other.items()
+        left = next(mine, None)
+        right = next(theirs, None)
+        while left is not None and right is not None:
+            if left[0] < right[0]:
+                merged.append(left)
+                left = next(mine, None)
+            elif right[0] < left[0]:
+                merged.append(right)
+                right = next(theirs, None)
+            else:
+                merged.append(right)
+                left = next(mine, None)
+                right = next(theirs, None)
+        while left is not None:
+            merged.append(left)
+            left = next(mine, None)
+        while right is not None:
+            merged.append(right)
+            right = next(theirs, None)
+        self.__load_sorted(merged)
+
+    def __load_sorted(self, items):
+        for index in xrange(1, len(items)):
+            if not items[index - 1][0] < items[index][0]:
+                raise ValueError("keys must be strictly increasing")
+        self.root = self.__build(items, 0, len(items), None)
+        self.length = len(items)
+
+    def __build(self, items, lo, hi, parent):
+        if lo >= hi:
+            return None
+        middle = (lo + hi) // 2
+        b_tree = self.__node_class(tuple(items[middle]), parent=parent)
+        b_tree.left = self.__build(items, lo, middle, b_tree)
+        b_tree.right = self.__build(items, middle + 1, hi, b_tree)
+        self.__update_node(b_tree)
+        return b_tree
+
+    def __find_node(self, key):
+        b_tree = self.root
+        while b_tree is not None:
+            if key < b_tree.data[0]:
+                b_tree = b_tree.left
+            elif key > b_tree.data[0]:
+                b_tree = b_tree.right
+            else:
+                return b_tree
+        return None
+
+    def __getitem__(self, key):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__getitem__(5)
+        'five'
+        >>> binary_tree.__getitem__(10)
+        """
+        b_tree = self.__find_node(key)
+        if b_tree is not None:
+            return b_tree.data[1]
+        return None
+
+    def __setitem__(self, key, value):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__setitem__(5, "FIVE")
+        >>> binary_tree.__getitem__(5), binary_tree.__len__()
+        ('FIVE', 1)
+        """
+        data = (key, value)
+        if self.root is None:
+            self.root = self.__node_class(data)
+            self.length += 1
+            if self.__on_event is not None:
+                self.__on_event("insert", data)
+            return
+        traverse = self.root
+        while True:
+            if key < traverse.data[0]:
+                if traverse.left is None:
+                    traverse.left = self.__node_class(data, parent=traverse)
+                    break
+                traverse = traverse.left
+            elif key > traverse.data[0]:
+                if traverse.right is None:
+                    traverse.right = self.__node_class(data, parent=traverse)
+                    break
+                traverse = traverse.right
+            else:
+                traverse.data = data
+                if self.__on_event is not None:
+                    self.__on_event("update", data)
+                return
+        self.length += 1
+        self.__retrace(traverse)
+        if self.__on_event is not None:
+            self.__on_event("insert", data)
+
+    @staticmethod
+    def __node_height(b_tree):
+        return -1 if b_tree is None else b_tree.height
+
+    @staticmethod
+    def __node_size(b_tree):
+        return 0 if b_tree is None else b_tree.size
+
+    def __retrace(self, b_tree):
+        while b_tree is not None:
+            left_height = self.__node_height(b_tree.left)
+            right_height = self.__node_height(b_tree.right)
+            b_tree.height = 1 + max(left_height, right_height)
+            b_tree.size = 1 + self.__node_size(b_tree.left) + self.__node_size(b_tree.right)
+            if self.__balanced and abs(left_height - right_height) > 1:
+                b_tree = self.__rebalance(b_tree, left_height - right_height)
+            b_tree = b_tree.parent
+
+    def __rebalance(self, b_tree, balance):
+        if balance > 1:
+            if self.__node_height(b_tree.left.left) < self.__node_height(b_tree.left.right):
+                self.__rotate_left(b_tree.left)
+            return self.__rotate_right(b_tree)
+        if self.__node_height(b_tree.right.right) < self.__node_height(b_tree.right.left):
+            self.__rotate_right(b_tree.right)
+        return self.__rotate_left(b_tree)
+
+    def __replace_child(self, parent, old, new):
+        if parent is None:
+            self.root = new
+        elif parent.left is old:
+            parent.left = new
         else:
-            return True
+            parent.right = new
+        if new is not None:
+            new.parent = parent
+
+    def __rotate_left(self, b_tree):
+        pivot = b_tree.right
+        b_tree.right = pivot.left
+        if pivot.left is not None:
+            pivot.left.parent = b_tree
+        self.__replace_child(b_tree.parent, b_tree, pivot)
+        pivot.left = b_tree
+        b_tree.parent = pivot
+        self.__update_node(b_tree)
+        self.__update_node(pivot)
+        return pivot
+
+    def __rotate_right(self, b_tree):
+        pivot = b_tree.left
+        b_tree.left = pivot.right
+        if pivot.right is not None:
+            pivot.right.parent = b_tree
+        self.__replace_child(b_tree.parent, b_tree, pivot)
+        pivot.right = b_tree
+        b_tree.parent = pivot
+        self.__update_node(b_tree)
+        self.__update_node(pivot)
+        return pivot
+
+    def __update_node(self, b_tree):
+        b_tree.height = 1 + max(self.__node_height(b_tree.left), self.__node_height(b_tree.right))
+        b_tree.size = 1 + self.__node_size(b_tree.left) + self.__node_size(b_tree.right)
+
+    def rank(self, key):
+        """
+        >>> binary_tree = BinarySearchTreeDict(balanced=True)
+        >>> for key in range(0, 100, 10): binary_tree[key] = str(key)
+        >>> binary_tree.rank(0), binary_tree.rank(35), binary_tree.rank(40), binary_tree.rank(1000)
+        (0, 4, 4, 10)
+        """
+        rank = 0
+        b_tree = self.root
+        while b_tree is not None:
+            if key < b_tree.data[0]:
+                b_tree = b_tree.left
+            elif key > b_tree.data[0]:
+                rank += self.__node_size(b_tree.left) + 1
+                b_tree = b_tree.right
+            else:
+                return rank + self.__node_size(b_tree.left)
+        return rank
+
+    def select(self, index):
+        """
+        >>> binary_tree = BinarySearchTreeDict(balanced=True)
+        >>> for key in range(0, 100, 10): binary_tree[key] = str(key)
+        >>> binary_tree.select(0), binary_tree.select(4), binary_tree.select(-1)
+        (0, 40, 90)
+        >>> binary_tree.select(10)
+        Traceback (most recent call last):
+        ...
+        IndexError: tree index out of range
+        """
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("tree index out of range")
+        return self.__select_node(index)[0].data[0]
+
+    def __select_node(self, index):
+        depth = 0
+        b_tree = self.root
+        while True:
+            left_size = self.__node_size(b_tree.left)
+            if index < left_size:
+                b_tree = b_tree.left
+            elif index > left_size:
+                index -= left_size + 1
+                b_tree = b_tree.right
+            else:
+                return b_tree, depth
+            depth += 1
+
+    def floor(self, key):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in (50, 30, 70): binary_tree[key] = str(key)
+        >>> binary_tree.floor(30), binary_tree.floor(69), binary_tree.floor(29)
+        (30, 50, None)
+        """
+        found = None
+        b_tree = self.root
+        while b_tree is not None:
+            if key < b_tree.data[0]:
+                b_tree = b_tree.left
+            elif key > b_tree.data[0]:
+                found = b_tree.data[0]
+                b_tree = b_tree.right
+            else:
+                return b_tree.data[0]
+        return found
+
+    def ceiling(self, key):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> for key in (50, 30, 70): binary_tree[key] = str(key)
+        >>> binary_tree.ceiling(70), binary_tree.ceiling(31), binary_tree.ceiling(71)
+        (70, 50, None)
+        """
+        found = None
+        b_tree = self.root
+        while b_tree is not None:
+            if key < b_tree.data[0]:
+                found = b_tree.data[0]
+                b_tree = b_tree.left
+            elif key > b_tree.data[0]:
+                b_tree = b_tree.right
+            else:
+                return b_tree.data[0]
+        return found
+
+    def min(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.min()
+        >>> for key in (50, 30, 70): binary_tree[key] = str(key)
+        >>> binary_tree.min()
+        30
+        """
+        if self.root is None:
+            return None
+        return self.__min_value(self.root).data[0]
+
+    def max(self):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.max()
+        >>> for key in (50, 30, 70): binary_tree[key] = str(key)
+        >>> binary_tree.max()
+        70
+        """
+        b_tree = self.root
+        if b_tree is None:
+            return None
+        while b_tree.right is not None:
+            b_tree = b_tree.right
+        return b_tree.data[0]
+
+    def range(self, lo=None, hi=None):
+        """
+        Lazily yields the (key, value) items with lo <= key < hi in key order.
+
+        >>> binary_tree = BinarySearchTreeDict(balanced=True)
+        >>> for key in range(0, 100, 10): binary_tree[key] = str(key)
+        >>> list(binary_tree.range(25, 50))
+        [(30, '30'), (40, '40')]
+        >>> [key for key, value in binary_tree.range(hi=20)]
+        [0, 10]
+        >>> [key for key, value in binary_tree.range(lo=80)]
+        [80, 90]
+        """
+        stack = []
+        b_tree = self.root
+        while b_tree is not None:
+            if lo is None or not b_tree.data[0] < lo:
+                stack.append(b_tree)
+                b_tree = b_tree.left
+            else:
+                b_tree = b_tree.right
+        while stack:
+            b_tree = stack.pop()
+            if hi is not None and not b_tree.data[0] < hi:
+                return
+            yield b_tree.data
+            b_tree = b_tree.right
+            while b_tree is not None:
+                stack.append(b_tree)
+                b_tree = b_tree.left
+
+    def __delitem__(self, key):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__delitem__(10)
+        Traceback (most recent call last):
+        ...
+        KeyError: 10
+        >>> binary_tree.__delitem__(5)
+        >>> binary_tree.__len__()
+        0
+        """
+        b_tree = self.__find_node(key)
+        if b_tree is None:
+            raise KeyError(key)
+        data = b_tree.data
+        self.__remove_node(b_tree)
+        if self.__on_event is not None:
+            self.__on_event("delete", data)
+
+    def __remove_node(self, b_tree):
+        if b_tree.left is not None and b_tree.right is not None:
+            successor = self.__min_value(b_tree.right)
+            b_tree.data = successor.data
+            b_tree = successor
+        child = b_tree.left if b_tree.left is not None else b_tree.right
+        parent = b_tree.parent
+        self.__replace_child(parent, b_tree, child)
+        b_tree.parent = b_tree.left = b_tree.right = None
+        self.length -= 1
+        self.__retrace(parent)
+
+    def __min_value(self, b_tree):
+        while b_tree.left is not None:
+            b_tree = b_tree.left
+        return b_tree
+
+    def __contains__(self, key):
+        """
+        >>> binary_tree = BinarySearchTreeDict()
+        >>> binary_tree.__setitem__(5, "five")
+        >>> binary_tree.__contains__(1)
+        False
+        >>> binary_tree.__contains__(5)
+        True
+        """
+        return self.__find_node(key) is not None
 
     def __len__(self):
         """
@@ -735,7 +3307,6 @@ class BinarySearchTreeDict(object):
         >>> binary_tree.__len__()
         0
         >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> binary_tree.__len__()
         1
         """
@@ -745,17 +3316,622 @@ class BinarySearchTreeDict(object):
         """
         >>> binary_tree = BinarySearchTreeDict()
         >>> binary_tree.__setitem__(5, "five")
-        "(5, 'five') inserted"
         >>> binary_tree.__setitem__(3, "Three")
-        "(3, 'Three') inserted"
         >>> binary_tree.__setitem__(7, "seven")
-        "(7, 'seven') inserted"
         >>> binary_tree.display()
         In-order tree traversal keys: 3->5->7
         Pre-order tree traversal keys: 5->3->7
         """
-        self.in_order_keys()
-        self.pre_order_keys()
+        print "In-order tree traversal keys: " + "->".join([str(key) for key in self.in_order_keys()])
+        print "Pre-order tree traversal keys: " + "->".join([str(key) for key in self.pre_order_keys()])
+
+
+class SkipListNode(SinglyLinkedNode):
+    def __init__(self, item=None, next_link=None, height=1):
+        """
+        Skip list tower: `next` is the bottom-level link and forward[i] the
+        link on level i + 1.
+
+        >>> node = SkipListNode((5, "five"), height=3)
+        >>> node.forward
+        [None, None]
+        """
+        super(SkipListNode, self).__init__(item, next_link)
+        self.forward = [None] * (height - 1)
+
+
+class CompactSkipListNode(CompactSinglyLinkedNode):
+    __slots__ = ('forward',)
+
+    def __init__(self, item=None, next_link=None, height=1):
+        super(CompactSkipListNode, self).__init__(item, next_link)
+        self.forward = [None] * (height - 1)
+
+
+class SkipListDict(object):
+    def __init__(self, probability=0.5, max_level=32, seed=None, compact=False, on_event=None):
+        """
+        Ordered map on a probabilistic skip list. The bottom level is a
+        singly linked list of (key, value) items in key order; each node is
+        promoted to the next level with `probability`, giving expected
+        O(log n) get, set and delete whatever order keys arrive in.
+
+        >>> skip_list = SkipListDict(seed=1)
+        >>> for key in range(100): skip_list[key] = str(key)
+        >>> skip_list[42], skip_list[100], skip_list.__len__(), skip_list.level
+        ('42', None, 100, 14)
+        >>> verbose_list = SkipListDict(compact=True, on_event=print_event)
+        >>> verbose_list.__setitem__(5, "five")
+        (5, 'five') inserted
+        >>> verbose_list.__setitem__(5, "FIVE")
+        (5, 'FIVE') updated
+        >>> verbose_list.__delitem__(5)
+        (5, 'FIVE') deleted
+        """
+        super(SkipListDict, self).__init__()
+        self.probability = probability
+        self.max_level = max_level
+        self.__random = random.Random(seed)
+        self.__node_class = CompactSkipListNode if compact else SkipListNode
+        self.__on_event = on_event
+        self.head = self.__node_class(None, None, max_level)
+        self.level = 1
+        self.length = 0
+
+    def __random_height(self):
+        height = 1
+        while height < self.max_level and self.__random.random() < self.probability:
+            height += 1
+        return height
+
+    def __predecessors(self, key):
+        # Rightmost node before `key` on every level, top level last filled.
+        update = [self.head] * self.level
+        node = self.head
+        for level in xrange(self.level - 1, 0, -1):
+            following = node.forward[level - 1]
+            while following is not None and following.item[0] < key:
+                node = following
+                following = node.forward[level - 1]
+            update[level] = node
+        following = node.next
+        while following is not None and following.item[0] < key:
+            node = following
+            following = node.next
+        update[0] = node
+        return update
+
+    def __find_node(self, key):
+        node = self.head
+        for level in xrange(self.level - 1, 0, -1):
+            following = node.forward[level - 1]
+            while following is not None and following.item[0] < key:
+                node = following
+                following = node.forward[level - 1]
+        node = node.next
+        while node is not None and node.item[0] < key:
+            node = node.next
+        if node is not None and node.item[0] == key:
+            return node
+        return None
+
+    def __getitem__(self, key):
+        node = self.__find_node(key)
+        return node.item[1] if node is not None else None
+
+    def __setitem__(self, key, value):
+        update = self.__predecessors(key)
+        following = update[0].next
+        if following is not None and following.item[0] == key:
+            following.item = (key, value)
+            event = "update"
+        else:
+            height = self.__random_height()
+            if height > self.level:
+                update.extend([self.head] * (height - self.level))
+                self.level = height
+            node = self.__node_class((key, value), update[0].next, height)
+            update[0].next = node
+            for level in xrange(1, height):
+                node.forward[level - 1] = update[level].forward[level - 1]
+                update[level].forward[level - 1] = node
+            self.length += 1
+            event = "insert"
+        if self.__on_event is not None:
+            self.__on_event(event, (key, value))
+
+    def __delitem__(self, key):
+        """
+        >>> skip_list = SkipListDict()
+        >>> for key in range(10): skip_list[key] = str(key)
+        >>> skip_list.__delitem__(3)
+        >>> skip_list.__delitem__(3)
+        Traceback (most recent call last):
+        ...
+        KeyError: 3
+        >>> list(skip_list.keys()) == [0, 1, 2, 4, 5, 6, 7, 8, 9]
+        True
+        """
+        update = self.__predecessors(key)
+        node = update[0].next
+        if node is None or node.item[0] != key:
+            raise KeyError(key)
+        update[0].next = node.next
+        for level in xrange(1, len(node.forward) + 1):
+            update[level].forward[level - 1] = node.forward[level - 1]
+        while self.level > 1 and self.head.forward[self.level - 2] is None:
+            self.level -= 1
+        self.length -= 1
+        if self.__on_event is not None:
+            self.__on_event("delete", node.item)
+
+    def __contains__(self, key):
+        return self.__find_node(key) is not None
+
+    def __len__(self):
+        return self.length
+
+    def items(self):
+        """
+        >>> skip_list = SkipListDict()
+        >>> for key in (5, 3, 7): skip_list[key] = str(key)
+        >>> list(skip_list.items()), list(skip_list), list(skip_list.values())
+        ([(3, '3'), (5, '5'), (7, '7')], [3, 5, 7], ['3', '5', '7'])
+        """
+        node = self.head.next
+        while node is not None:
+            yield node.item
+            node = node.next
+
+    def keys(self):
+        for item in self.items():
+            yield item[0]
+
+    __iter__ = keys
+
+    def values(self):
+        for item in self.items():
+            yield item[1]
+
+    def range(self, lo=None, hi=None):
+        """
+        Lazily yields the (key, value) items with lo <= key < hi in key order.
+
+        >>> skip_list = SkipListDict()
+        >>> for key in range(0, 100, 10): skip_list[key] = str(key)
+        >>> list(skip_list.range(25, 50))
+        [(30, '30'), (40, '40')]
+        >>> [key for key, value in skip_list.range(hi=20)], [key for key, value in skip_list.range(lo=80)]
+        ([0, 10], [80, 90])
+        """
+        node = self.head.next if lo is None else self.__predecessors(lo)[0].next
+        while node is not None and (hi is None or node.item[0] < hi):
+            yield node.item
+            node = node.next
+
+    def floor(self, key):
+        """
+        >>> skip_list = SkipListDict()
+        >>> for key in (50, 30, 70): skip_list[key] = str(key)
+        >>> skip_list.floor(30), skip_list.floor(69), skip_list.floor(29)
+        (30, 50, None)
+        """
+        node = self.__predecessors(key)[0]
+        following = node.next
+        if following is not None and following.item[0] == key:
+            return key
+        return node.item[0] if node is not self.head else None
+
+    def ceiling(self, key):
+        """
+        >>> skip_list = SkipListDict()
+        >>> for key in (50, 30, 70): skip_list[key] = str(key)
+        >>> skip_list.ceiling(70), skip_list.ceiling(31), skip_list.ceiling(71)
+        (70, 50, None)
+        """
+        following = self.__predecessors(key)[0].next
+        return following.item[0] if following is not None else None
+
+    def min(self):
+        return self.head.next.item[0] if self.head.next is not None else None
+
+    def max(self):
+        """
+        >>> skip_list = SkipListDict()
+        >>> skip_list.max()
+        >>> for key in (50, 30, 70): skip_list[key] = str(key)
+        >>> skip_list.min(), skip_list.max()
+        (30, 70)
+        """
+        node = self.head
+        for level in xrange(self.level - 1, 0, -1):
+            while node.forward[level - 1] is not None:
+                node = node.forward[level - 1]
+        while node.next is not None:
+            node = node.next
+        return node.item[0] if node is not self.head else None
+
+    def display(self):
+        """
+        >>> skip_list = SkipListDict(seed=1)
+        >>> for key in (5, 3, 7): skip_list[key] = str(key)
+        >>> skip_list.display()
+        Level 4: 7
+        Level 3: 7
+        Level 2: 5->7
+        Level 1: 3->5->7
+        """
+        for level in xrange(self.level - 1, -1, -1):
+            keys = []
+            node = self.head.forward[level - 1] if level else self.head.next
+            while node is not None:
+                keys.append(str(node.item[0]))
+                node = node.forward[level - 1] if level else node.next
+            print "Level " + str(level + 1) + ": " + "->".join(keys)
+
+
+class SortedBlockDict(object):
+    def __init__(self, fanout=1000, on_event=None):
+        """
+        Ordered map with the BinarySearchTreeDict interface, stored as a list
+        of sorted blocks of keys and parallel blocks of values. A key is found
+        by bisecting the list of block maxima and then its block; blocks split
+        at 2 * fanout entries and are merged into a neighbour below fanout / 2,
+        so iteration and range scans run over contiguous lists.
+
+        >>> blocks = SortedBlockDict(fanout=4)
+        >>> for key in range(20): blocks[key] = str(key)
+        >>> blocks.block_sizes()
+        [4, 4, 4, 8]
+        >>> for key in range(0, 20, 2): del blocks[key]
+        >>> list(blocks.keys()), blocks.block_sizes()
+        ([1, 3, 5, 7, 9, 11, 13, 15, 17, 19], [2, 2, 2, 4])
+        >>> verbose_blocks = SortedBlockDict(on_event=print_event)
+        >>> verbose_blocks.__setitem__(5, "five")
+        (5, 'five') inserted
+        >>> verbose_blocks.__setitem__(5, "FIVE")
+        (5, 'FIVE') updated
+        >>> verbose_blocks.__delitem__(5)
+        (5, 'FIVE') deleted
+        """
+        super(SortedBlockDict, self).__init__()
+        self.fanout = fanout
+        self.__on_event = on_event
+        self.__keys = []
+        self.__values = []
+        self.__maxes = []
+        self.length = 0
+
+    def block_sizes(self):
+        return [len(block) for block in self.__keys]
+
+    @property
+    def nbytes(self):
+        """Size of the block lists in bytes, over-allocation included; the keys and values are not counted."""
+        size = sys.getsizeof(self.__keys) + sys.getsizeof(self.__values) + sys.getsizeof(self.__maxes)
+        for keys, values in zip(self.__keys, self.__values):
+            size += sys.getsizeof(keys) + sys.getsizeof(values)
+        return size
+
+    def __locate(self, key):
+        block = bisect.bisect_left(self.__maxes, key)
+        if block == len(self.__maxes):
+            return block, 0
+        return block, bisect.bisect_left(self.__keys[block], key)
+
+    def __getitem__(self, key):
+        """
+        >>> blocks = SortedBlockDict()
+        >>> blocks.__setitem__(5, "five")
+        >>> blocks.__getitem__(5), blocks.__getitem__(10)
+        ('five', None)
+        """
+        block, index = self.__locate(key)
+        if block < len(self.__keys) and self.__keys[block][index] == key:
+            return self.__values[block][index]
+        return None
+
+    def __setitem__(self, key, value):
+        if not self.__maxes:
+            self.__keys.append([key])
+            self.__values.append([value])
+            self.__maxes.append(key)
+            self.length = 1
+            event = "insert"
+        else:
+            block, index = self.__locate(key)
+            if block == len(self.__maxes):
+                block -= 1
+                index = len(self.__keys[block])
+                self.__maxes[block] = key
+            keys = self.__keys[block]
+            if index < len(keys) and keys[index] == key:
+                self.__values[block][index] = value
+                event = "update"
+            else:
+                keys.insert(index, key)
+                self.__values[block].insert(index, value)
+                self.length += 1
+                if len(keys) > 2 * self.fanout:
+                    self.__split(block)
+                event = "insert"
+        if self.__on_event is not None:
+            self.__on_event(event, (key, value))
+
+    def __split(self, block):
+        keys = self.__keys[block]
+        values = self.__values[block]
+        half = len(keys) // 2
+        self.__keys[block + 1:block + 1] = [keys[half:]]
+        self.__values[block + 1:block + 1] = [values[half:]]
+        del keys[half:]
+        del values[half:]
+        self.__maxes.insert(block, keys[-1])
+
+    def __delitem__(self, key):
+        """
+        >>> blocks = SortedBlockDict()
+        >>> blocks.__delitem__(10)
+        Traceback (most recent call last):
+        ...
+        KeyError: 10
+        """
+        block, index = self.__locate(key)
+        if block == len(self.__keys) or self.__keys[block][index] != key:
+            raise KeyError(key)
+        keys = self.__keys[block]
+        del keys[index]
+        value = self.__values[block].pop(index)
+        self.length -= 1
+        if not keys:
+            del self.__keys[block], self.__values[block], self.__maxes[block]
+        else:
+            self.__maxes[block] = keys[-1]
+            if len(keys) < self.fanout // 2 and len(self.__keys) > 1:
+                self.__merge_block(block)
+        if self.__on_event is not None:
+            self.__on_event("delete", (key, value))
+
+    def __merge_block(self, block):
+        if block == len(self.__keys) - 1:
+            block -= 1
+        self.__keys[block].extend(self.__keys.pop(block + 1))
+        self.__values[block].extend(self.__values.pop(block + 1))
+        del self.__maxes[block]
+        self.__maxes[block] = self.__keys[block][-1]
+        if len(self.__keys[block]) > 2 * self.fanout:
+            self.__split(block)
+
+    def __contains__(self, key):
+        block, index = self.__locate(key)
+        return block < len(self.__keys) and self.__keys[block][index] == key
+
+    def __len__(self):
+        return self.length
+
+    def items(self):
+        """
+        >>> blocks = SortedBlockDict(fanout=2)
+        >>> for key in (5, 3, 7, 1): blocks[key] = str(key)
+        >>> list(blocks.items()), list(blocks), list(blocks.values())
+        ([(1, '1'), (3, '3'), (5, '5'), (7, '7')], [1, 3, 5, 7], ['1', '3', '5', '7'])
+        >>> list(blocks.reversed()), list(reversed(blocks))
+        ([7, 5, 3, 1], [7, 5, 3, 1])
+        """
+        for keys, values in zip(self.__keys, self.__values):
+            for item in zip(keys, values):
+                yield item
+
+    def keys(self):
+        for keys in self.__keys:
+            for key in keys:
+                yield key
+
+    __iter__ = keys
+    in_order_keys = keys
+
+    def values(self):
+        for values in self.__values:
+            for value in values:
+                yield value
+
+    def reversed(self):
+        for block in xrange(len(self.__keys) - 1, -1, -1):
+            keys = self.__keys[block]
+            for index in xrange(len(keys) - 1, -1, -1):
+                yield keys[index]
+
+    __reversed__ = reversed
+
+    @classmethod
+    def from_sorted(cls, items, **kwargs):
+        """
+        >>> blocks = SortedBlockDict.from_sorted(((key, str(key)) for key in range(7)), fanout=3)
+        >>> blocks.block_sizes(), blocks.__len__()
+        ([3, 3, 1], 7)
+        >>> SortedBlockDict.from_sorted([(2, "two"), (1, "one")])
+        Traceback (most recent call last):
+        ...
+        ValueError: keys must be strictly increasing
+        """
+        blocks = cls(**kwargs)
+        blocks.__load_sorted(list(items))
+        return blocks
+
+    def __load_sorted(self, items):
+        for index in xrange(1, len(items)):
+            if not items[index - 1][0] < items[index][0]:
+                raise ValueError("keys must be strictly increasing")
+        fanout = self.fanout
+        self.__keys = [[key for key, _ in items[start:start + fanout]] for start in xrange(0, len(items), fanout)]
+        self.__values = [[value for _, value in items[start:start + fanout]]
+                         for start in xrange(0, len(items), fanout)]
+        self.__maxes = [keys[-1] for keys in self.__keys]
+        self.length = len(items)
+
+    def merge(self, other):
+        """
+        >>> blocks = SortedBlockDict.from_sorted([(1, "one"), (3, "three"), (5, "five")])
+        >>> other = SortedBlockDict.from_sorted([(2, "two"), (3, "THREE"), (6, "six")])
+        >>> blocks.merge(other)
+        >>> list(blocks.items())
+        [(1, 'one'), (2, 'two'), (3, 'THREE'), (5, 'five'), (6, 'six')]
+        """
+        merged = []
+        mine = self.items()
+        theirs = other.items()
+        left = next(mine, None)
+        right = next(theirs, None)
+        while left is not None and right is not None:
+            if left[0] < right[0]:
+                merged.append(left)
+                left = next(mine, None)
+            elif right[0] < left[0]:
+                merged.append(right)
+                right = next(theirs, None)
+            else:
+                merged.append(right)
+                left = next(mine, None)
+                right = next(theirs, None)
+        if left is not None:
+            merged.append(left)
+            merged.extend(mine)
+        if right is not None:
+            merged.append(right)
+            merged.extend(theirs)
+        self.__load_sorted(merged)
+
+    def dump(self, fileobj, chunk_size=4096):
+        """
+        >>> import io
+        >>> blocks = SortedBlockDict.from_sorted((key, str(key)) for key in range(100))
+        >>> snapshot = io.BytesIO()
+        >>> blocks.dump(snapshot)
+        >>> SortedBlockDict.load(io.BytesIO(snapshot.getvalue()))[99]
+        '99'
+        """
+        _dump_snapshot(fileobj, "blocks", self.length, self.items(), chunk_size)
+
+    @classmethod
+    def load(cls, fileobj, **kwargs):
+        count, chunks = _load_snapshot(fileobj, "blocks")
+        items = []
+        for chunk in chunks:
+            items.extend(chunk)
+        return cls.from_sorted(items, **kwargs)
+
+    def rank(self, key):
+        """
+        Number of keys less than `key`; O(number of blocks).
+
+        >>> blocks = SortedBlockDict(fanout=2)
+        >>> for key in range(0, 100, 10): blocks[key] = str(key)
+        >>> blocks.rank(0), blocks.rank(35), blocks.rank(40), blocks.rank(1000)
+        (0, 4, 4, 10)
+        """
+        block, index = self.__locate(key)
+        return sum(len(keys) for keys in self.__keys[:block]) + index
+
+    def select(self, index):
+        """
+        >>> blocks = SortedBlockDict(fanout=2)
+        >>> for key in range(0, 100, 10): blocks[key] = str(key)
+        >>> blocks.select(0), blocks.select(4), blocks.select(-1)
+        (0, 40, 90)
+        >>> blocks.select(10)
+        Traceback (most recent call last):
+        ...
+        IndexError: tree index out of range
+        """
+        if index < 0:
+            index += self.length
+        if not 0 <= index < self.length:
+            raise IndexError("tree index out of range")
+        for keys in self.__keys:
+            if index < len(keys):
+                return keys[index]
+            index -= len(keys)
+
+    def floor(self, key):
+        """
+        >>> blocks = SortedBlockDict(fanout=1)
+        >>> for key in (50, 30, 70): blocks[key] = str(key)
+        >>> blocks.floor(30), blocks.floor(69), blocks.floor(29)
+        (30, 50, None)
+        """
+        block = bisect.bisect_left(self.__maxes, key)
+        if block < len(self.__keys):
+            keys = self.__keys[block]
+            index = bisect.bisect_right(keys, key)
+            if index:
+                return keys[index - 1]
+        return self.__maxes[block - 1] if block else None
+
+    def ceiling(self, key):
+        """
+        >>> blocks = SortedBlockDict(fanout=1)
+        >>> for key in (50, 30, 70): blocks[key] = str(key)
+        >>> blocks.ceiling(70), blocks.ceiling(31), blocks.ceiling(71)
+        (70, 50, None)
+        """
+        block, index = self.__locate(key)
+        if block == len(self.__keys):
+            return None
+        return self.__keys[block][index]
+
+    def min(self):
+        """
+        >>> blocks = SortedBlockDict()
+        >>> blocks.min()
+        >>> for key in (50, 30, 70): blocks[key] = str(key)
+        >>> blocks.min(), blocks.max()
+        (30, 70)
+        """
+        return self.__keys[0][0] if self.__keys else None
+
+    def max(self):
+        return self.__maxes[-1] if self.__maxes else None
+
+    def range(self, lo=None, hi=None):
+        """
+        Lazily yields the (key, value) items with lo <= key < hi in key order.
+
+        >>> blocks = SortedBlockDict(fanout=2)
+        >>> for key in range(0, 100, 10): blocks[key] = str(key)
+        >>> list(blocks.range(25, 50))
+        [(30, '30'), (40, '40')]
+        >>> [key for key, value in blocks.range(hi=20)]
+        [0, 10]
+        >>> [key for key, value in blocks.range(lo=80)]
+        [80, 90]
+        """
+        if lo is None:
+            block, index = 0, 0
+        else:
+            block, index = self.__locate(lo)
+        while block < len(self.__keys):
+            keys = self.__keys[block]
+            values = self.__values[block]
+            stop = len(keys)
+            if hi is not None and not keys[-1] < hi:
+                stop = bisect.bisect_left(keys, hi, index)
+            for item in zip(keys[index:stop], values[index:stop]):
+                yield item
+            if stop < len(keys):
+                return
+            block += 1
+            index = 0
+
+    def display(self):
+        """
+        >>> blocks = SortedBlockDict(fanout=1)
+        >>> for key in (5, 3, 7): blocks[key] = str(key)
+        >>> blocks.display()
+        In-order keys: 3->5->7
+        Block sizes: 1->2
+        """
+        print "In-order keys: " + "->".join([str(key) for key in self.keys()])
+        print "Block sizes: " + "->".join([str(size) for size in self.block_sizes()])
 
 
 def terrible_hash(bin):
@@ -798,9 +3974,9 @@ def main():
 
     print "\n---------------Linked List---------------------\n"
 
-    single_linked_list = SinglyLinkedList()
+    single_linked_list = SinglyLinkedList(on_event=print_event)
     for i in range(0, 5):
-        print single_linked_list.prepend(i)
+        single_linked_list.prepend(i)
     print "After adding elements: ", single_linked_list.__repr__()
     if single_linked_list.remove(3) == 1:
         print "element 3 removed"
@@ -818,10 +3994,10 @@ def main():
 
     print "\n---------------Binary Search Tree---------------------\n"
 
-    tree_dictionary = BinarySearchTreeDict()
+    tree_dictionary = BinarySearchTreeDict(on_event=print_event)
 
-    print tree_dictionary.__setitem__(100, "hundred")
-    print tree_dictionary.__setitem__(150, "one hundred and fifty")
+    tree_dictionary.__setitem__(100, "hundred")
+    tree_dictionary.__setitem__(150, "one hundred and fifty")
     print "similarly other elements are inserted"
     tree_dictionary.__setitem__(50, "fifty")
     tree_dictionary.__setitem__(75, "Seventy five")
@@ -837,11 +4013,11 @@ def main():
     tree_dictionary.__setitem__(1, "one")
     tree_dictionary.__setitem__(0, "zero")
 
-    tree_dictionary.in_order_keys()
-    tree_dictionary.post_order_keys()
-    tree_dictionary.pre_order_keys()
+    print "In-order tree traversal keys: " + "->".join([str(key) for key in tree_dictionary.in_order_keys()])
+    print "Post-order tree traversal keys: " + "->".join([str(key) for key in tree_dictionary.post_order_keys()])
+    print "Pre-order tree traversal keys: " + "->".join([str(key) for key in tree_dictionary.pre_order_keys()])
 
-    tree_dictionary.items()
+    print "Values : " + " -> ".join([str(value) for value in tree_dictionary.values()])
 
     print "size of the tree: ", tree_dictionary.__len__()
 
@@ -861,9 +4037,9 @@ def main():
 
     print "---------------Chained Hash---------------------\n"
 
-    chained_hash = ChainedHashDict(hashfunc=terrible_hash(5))
-    print chained_hash.__setitem__(5, "five")
-    print chained_hash.__setitem__(15, "fifteen")
+    chained_hash = ChainedHashDict(hashfunc=terrible_hash(5), on_event=print_event)
+    chained_hash.__setitem__(5, "five")
+    chained_hash.__setitem__(15, "fifteen")
     print "before rebuild"
     chained_hash.display()
     print "similarly other items are added"
@@ -889,9 +4065,9 @@ def main():
 
     print "\n---------------open-address hashing---------------------\n"
 
-    open_add_hashing = OpenAddressHashDict()
-    print open_add_hashing.__setitem__(5, "five")
-    print open_add_hashing.__setitem__(15, "fifteen")
+    open_add_hashing = OpenAddressHashDict(on_event=print_event)
+    open_add_hashing.__setitem__(5, "five")
+    open_add_hashing.__setitem__(15, "fifteen")
     print "before rebuild"
     open_add_hashing.display()
     print "adding other items similarly"
@@ -0,0 +1,869 @@
+"""Benchmarks for the containers in DataStructures.py.
+
+    python datastructures_benchmark.py 100000
+    python datastructures_benchmark.py --suite --sizes 1000,10000 --output run.json
+    python datastructures_benchmark.py --suite --output new.json --compare run.json
+
+The first form prints every benchmark table for one size. --suite runs the
+reproducible cases instead: each is timed `repeat` times, the fastest run is
+kept, and the report can be written as JSON and compared with an earlier one.
+"""
+import argparse
+import bisect
+import collections
+import gc
+import io
+import json
+import platform
+import random
+import sys
+import threading
+from timeit import default_timer as clock
+try:
+    import cPickle as pickle
+except ImportError:
+    import pickle
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from DataStructures import BinarySearchTreeDict
+from DataStructures import ChainedHashDict
+from DataStructures import ConcurrentHashDict
+from DataStructures import FilteredDict
+from DataStructures import DELETED
+from DataStructures import HashTableStats
+from DataStructures import LRUCacheDict
+from DataStructures import OpenAddressHashDict
+from DataStructures import ProcessShardedHashDict
+from DataStructures import SkipListDict
+from DataStructures import SortedBlockDict
+from DataStructures import TypedOpenAddressHashDict
+from DataStructures import SinglyLinkedList
+from DataStructures import terrible_hash
+
+DISTRIBUTIONS = ("sequential", "random", "terrible_hash")
+STRUCTURES = ("dict", "SinglyLinkedList", "ChainedHashDict", "OpenAddressHashDict", "BinarySearchTreeDict")
+
+
+def object_bytes(obj):
+    """
+    Size of an object including its instance __dict__, if it has one.
+
+    >>> object_bytes(object()) > 0
+    True
+    """
+    size = sys.getsizeof(obj)
+    if hasattr(obj, '__dict__'):
+        size += sys.getsizeof(obj.__dict__)
+    return size
+
+
+def linked_list_bytes(linked_list):
+    size = object_bytes(linked_list)
+    node = linked_list.head
+    while node is not None:
+        size += object_bytes(node)
+        node = node.next
+    return size
+
+
+def chained_hash_bytes(chained_hash):
+    size = object_bytes(chained_hash) + sys.getsizeof(chained_hash.hash_table)
+    for linked_list in chained_hash.hash_table:
+        if linked_list is not None:
+            size += linked_list_bytes(linked_list)
+    return size
+
+
+def tree_bytes(tree):
+    size = object_bytes(tree)
+    stack = [tree.root] if tree.root is not None else []
+    while stack:
+        node = stack.pop()
+        size += object_bytes(node)
+        if node.left is not None:
+            stack.append(node.left)
+        if node.right is not None:
+            stack.append(node.right)
+    return size
+
+
+def open_hash_bytes(open_hash):
+    size = object_bytes(open_hash) + sys.getsizeof(open_hash.hash_table)
+    for entry in open_hash.hash_table:
+        if entry is not None and entry is not DELETED:
+            size += sys.getsizeof(entry) + sum(sys.getsizeof(field) for field in entry)
+    return size
+
+
+def sorted_block_bytes(blocks):
+    return object_bytes(blocks) + blocks.nbytes
+
+
+def traverse_list(linked_list):
+    node = linked_list.head
+    while node is not None:
+        node = node.next
+
+
+def bench_node_memory(n=100000, seed=0):
+    """Compare the default and compact node storage modes.
+
+    Returns a list of (structure, mode, bytes, bytes per entry,
+    seconds to build, seconds to traverse) rows.
+    """
+    rng = random.Random(seed)
+    keys = list(range(n))
+    rng.shuffle(keys)
+    rows = []
+    for compact in (False, True):
+        mode = "compact" if compact else "default"
+
+        start = clock()
+        linked_list = SinglyLinkedList(compact=compact)
+        for key in keys:
+            linked_list.append(key)
+        built = clock() - start
+        start = clock()
+        traverse_list(linked_list)
+        walked = clock() - start
+        size = linked_list_bytes(linked_list)
+        rows.append(("SinglyLinkedList", mode, size, float(size) / n, built, walked))
+
+        start = clock()
+        chained_hash = ChainedHashDict(compact=compact)
+        for key in keys:
+            chained_hash[key] = key
+        built = clock() - start
+        start = clock()
+        for key in keys:
+            chained_hash[key]
+        walked = clock() - start
+        size = chained_hash_bytes(chained_hash)
+        rows.append(("ChainedHashDict", mode, size, float(size) / n, built, walked))
+
+        start = clock()
+        tree = BinarySearchTreeDict(compact=compact)
+        for key in keys:
+            tree[key] = key
+        built = clock() - start
+        start = clock()
+        for key in keys:
+            tree[key]
+        walked = clock() - start
+        size = tree_bytes(tree)
+        rows.append(("BinarySearchTreeDict", mode, size, float(size) / n, built, walked))
+    return rows
+
+
+def bench_typed_memory(n=100000, seed=0):
+    """OpenAddressHashDict against TypedOpenAddressHashDict on int64 keys and values.
+
+    Returns (structure, bytes, bytes per entry, build seconds, lookup seconds) rows.
+    """
+    rng = random.Random(seed)
+    keys = [rng.getrandbits(48) for _ in range(n)]
+    rows = []
+    for name, factory, measure in (("OpenAddressHashDict", OpenAddressHashDict, open_hash_bytes),
+                                   ("TypedOpenAddressHashDict", TypedOpenAddressHashDict,
+                                    lambda typed_hash: typed_hash.nbytes)):
+        table = factory()
+        start = clock()
+        for key in keys:
+            table[key] = key
+        built = clock() - start
+        start = clock()
+        for key in keys:
+            table[key]
+        looked_up = clock() - start
+        size = measure(table)
+        rows.append((name, size, float(size) / n, built, looked_up))
+    return rows
+
+
+def percentile(sorted_samples, fraction):
+    """
+    >>> percentile([1, 2, 3, 4], 0.5)
+    3
+    """
+    index = min(len(sorted_samples) - 1, int(fraction * len(sorted_samples)))
+    return sorted_samples[index]
+
+
+def bench_insert_latency(n=1000000, seed=0):
+    """Per-insert latency of ChainedHashDict with and without incremental rehashing.
+
+    Returns a list of (mode, p50, p99, p99.9, max) rows in microseconds.
+    The cyclic garbage collector is paused so its sweeps are not
+    attributed to the table.
+    """
+    rng = random.Random(seed)
+    keys = [rng.getrandbits(48) for _ in range(n)]
+    rows = []
+    for incremental in (False, True):
+        chained_hash = ChainedHashDict(incremental=incremental, compact=True)
+        samples = [0.0] * n
+        gc.disable()
+        try:
+            for i, key in enumerate(keys):
+                start = clock()
+                chained_hash[key] = i
+                samples[i] = clock() - start
+        finally:
+            gc.enable()
+        samples.sort()
+        mode = "incremental" if incremental else "stop-the-world"
+        rows.append((mode,) + tuple(1e6 * percentile(samples, fraction) for fraction in (0.5, 0.99, 0.999, 1.0)))
+    return rows
+
+
+def displacement(open_hash):
+    """Mean and maximum distance of live entries from their home slot."""
+    table = open_hash.hash_table
+    bin_count = len(table)
+    total = 0
+    longest = 0
+    count = 0
+    for index, entry in enumerate(table):
+        if entry is not None and entry is not DELETED:
+            distance = (index - entry[2]) % bin_count
+            total += distance
+            longest = max(longest, distance)
+            count += 1
+    return float(total) / max(count, 1), longest
+
+
+def bench_probe_churn(n=100000, rounds=10, seed=0):
+    """Delete/insert churn against OpenAddressHashDict at a constant live size.
+
+    Each round deletes a tenth of the live keys and inserts as many fresh
+    ones. Returns (mode, round, mean displacement, max displacement,
+    tombstones, microseconds per missing-key lookup) rows.
+    """
+    rows = []
+    for robin_hood in (False, True):
+        rng = random.Random(seed)
+        open_hash = OpenAddressHashDict(robin_hood=robin_hood)
+        live = [rng.getrandbits(48) for _ in range(n)]
+        for key in live:
+            open_hash[key] = key
+        misses = [rng.getrandbits(48) | (1 << 48) for _ in range(10000)]
+        mode = "robin hood" if robin_hood else "linear"
+        for churn_round in range(rounds + 1):
+            if churn_round:
+                rng.shuffle(live)
+                for key in live[:n // 10]:
+                    open_hash.pop(key)
+                live[:n // 10] = [rng.getrandbits(48) for _ in range(n // 10)]
+                for key in live[:n // 10]:
+                    open_hash[key] = key
+            start = clock()
+            for key in misses:
+                key in open_hash
+            miss_time = 1e6 * (clock() - start) / len(misses)
+            mean, longest = displacement(open_hash)
+            rows.append((mode, churn_round, mean, longest, open_hash.tombstones, miss_time))
+    return rows
+
+
+def key_stream(kind, n, seed=0):
+    """
+    >>> key_stream("reverse", 3)
+    [2, 1, 0]
+    """
+    keys = list(range(n))
+    if kind == "reverse":
+        keys.reverse()
+    elif kind == "random":
+        random.Random(seed).shuffle(keys)
+    return keys
+
+
+def bench_tree_streams(n=5000):
+    """Unbalanced versus AVL BinarySearchTreeDict on sorted, reverse-sorted and random keys.
+
+    Returns (stream, mode, height, insert seconds, lookup seconds) rows.
+    """
+    rows = []
+    for kind in ("sorted", "reverse", "random"):
+        keys = key_stream(kind, n)
+        for balanced in (False, True):
+            tree = BinarySearchTreeDict(balanced=balanced)
+            start = clock()
+            for key in keys:
+                tree[key] = key
+            inserted = clock() - start
+            start = clock()
+            for key in keys:
+                tree[key]
+            looked_up = clock() - start
+            mode = "avl" if balanced else "unbalanced"
+            rows.append((kind, mode, tree.root.height, inserted, looked_up))
+    return rows
+
+
+class LockedHashDict(object):
+    """A ChainedHashDict behind one global lock, the baseline for ConcurrentHashDict."""
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__hash = ChainedHashDict()
+
+    def __getitem__(self, key):
+        with self.__lock:
+            return self.__hash[key]
+
+    def __setitem__(self, key, value):
+        with self.__lock:
+            self.__hash[key] = value
+
+
+def bench_concurrent(n=100000, thread_counts=(1, 4, 16), read_fraction=0.9, seed=0):
+    """Mixed read/write throughput of a shared table across a thread pool.
+
+    n operations are split evenly over the threads. Returns (mode,
+    threads, seconds, operations per second) rows.
+    """
+    rows = []
+    for mode, factory in (("global lock", LockedHashDict), ("sharded", ConcurrentHashDict)):
+        for thread_count in thread_counts:
+            table = factory()
+            for key in range(n // 10):
+                table[key] = key
+
+            def worker(worker_seed):
+                rng = random.Random(worker_seed)
+                for _ in range(n // thread_count):
+                    key = rng.randrange(n // 5)
+                    if rng.random() < read_fraction:
+                        table[key]
+                    else:
+                        table[key] = key
+
+            threads = [threading.Thread(target=worker, args=(seed + index,)) for index in range(thread_count)]
+            start = clock()
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            elapsed = clock() - start
+            rows.append((mode, thread_count, elapsed, n / elapsed))
+    return rows
+
+
+def bench_process_shards(n=100000, process_counts=(1, 2, 4), batch=50000, seed=0):
+    """Bulk load and lookup through ProcessShardedHashDict against one in-process table.
+
+    Returns (mode, processes, load seconds, lookup seconds) rows.
+    """
+    rng = random.Random(seed)
+    keys = [rng.getrandbits(48) for _ in range(n)]
+    items = [(key, key) for key in keys]
+    open_hash = OpenAddressHashDict()
+    start = clock()
+    open_hash.update(items)
+    loaded = clock() - start
+    start = clock()
+    [open_hash[key] for key in keys]
+    rows = [("in-process", 1, loaded, clock() - start)]
+    for process_count in process_counts:
+        with ProcessShardedHashDict(process_count=process_count) as sharded_hash:
+            start = clock()
+            for offset in range(0, n, batch):
+                sharded_hash.set_many(items[offset:offset + batch])
+            loaded = clock() - start
+            start = clock()
+            for offset in range(0, n, batch):
+                sharded_hash.get_many(keys[offset:offset + batch])
+            rows.append(("sharded", process_count, loaded, clock() - start))
+    return rows
+
+
+def bench_snapshots(n=100000, seed=0):
+    """dump()/load() snapshots against pickling the whole structure.
+
+    Returns (structure, format, bytes, dump seconds, load seconds) rows.
+    """
+    rng = random.Random(seed)
+    items = [(rng.getrandbits(48), str(index)) for index in range(n)]
+    tree = BinarySearchTreeDict.from_sorted(sorted(items))
+    rows = []
+    for name, table in (("ChainedHashDict", ChainedHashDict.from_items(items)),
+                        ("OpenAddressHashDict", OpenAddressHashDict.from_items(items)),
+                        ("BinarySearchTreeDict", tree)):
+        start = clock()
+        snapshot = io.BytesIO()
+        table.dump(snapshot)
+        dumped = clock() - start
+        start = clock()
+        type(table).load(io.BytesIO(snapshot.getvalue()))
+        rows.append((name, "snapshot", len(snapshot.getvalue()), dumped, clock() - start))
+
+        start = clock()
+        payload = pickle.dumps(table, pickle.HIGHEST_PROTOCOL)
+        dumped = clock() - start
+        start = clock()
+        pickle.loads(payload)
+        rows.append((name, "pickle", len(payload), dumped, clock() - start))
+    return rows
+
+
+def bench_batch_lookup(n=100000, batch=10000, seed=0):
+    """Per-key __getitem__ against get_many() over batches of keys, half of them missing.
+
+    Returns (structure, mode, lookups per second) rows. The NumPy rows are
+    only produced when NumPy is installed.
+    """
+    rng = random.Random(seed)
+    keys = [rng.getrandbits(40) for _ in range(n)]
+    probes = [rng.choice(keys) if rng.random() < 0.5 else rng.getrandbits(40) for _ in range(n)]
+    batches = [probes[offset:offset + batch] for offset in range(0, n, batch)]
+    rows = []
+    for factory in (ChainedHashDict, OpenAddressHashDict, TypedOpenAddressHashDict):
+        table = factory()
+        table.update((key, key) for key in keys)
+        modes = [("per key", lambda chunk: [table[key] for key in chunk]),
+                 ("get_many", table.get_many)]
+        if numpy is not None:
+            arrays = [numpy.array(chunk, dtype=numpy.int64) for chunk in batches]
+            modes.append(("get_many numpy", table.get_many))
+        for mode, lookup in modes:
+            chunks = arrays if mode.endswith("numpy") else batches
+            start = clock()
+            for chunk in chunks:
+                lookup(chunk)
+            rows.append((factory.__name__, mode, n / (clock() - start)))
+    return rows
+
+
+_MISS = object()
+
+
+def zipf_keys(n, universe, exponent=1.1, seed=0):
+    """
+    `n` keys drawn from range(universe) with probability proportional to
+    1 / (rank + 1) ** exponent.
+
+    >>> keys = zipf_keys(1000, 100)
+    >>> keys.count(0) > keys.count(50)
+    True
+    """
+    cumulative = []
+    total = 0.0
+    for rank in range(universe):
+        total += 1.0 / (rank + 1) ** exponent
+        cumulative.append(total)
+    rng = random.Random(seed)
+    return [bisect.bisect_left(cumulative, rng.random() * total) for _ in range(n)]
+
+
+def bench_lru_cache(n=100000, universe=100000, capacity=1000):
+    """Memoising a function under a Zipfian key stream.
+
+    Returns (cache, hit ratio, calls per second) rows. The baseline is the
+    usual OrderedDict memoiser, as functools.lru_cache is not in Python 2.
+    """
+    keys = zipf_keys(n, universe)
+    rows = []
+    cache = LRUCacheDict(max_entries=capacity)
+
+    def cached(key):
+        value = cache.get(key, _MISS)
+        if value is _MISS:
+            value = key * 2
+            cache.put(key, value)
+        return value
+    start = clock()
+    for key in keys:
+        cached(key)
+    rows.append(("LRUCacheDict", float(cache.hits) / n, n / (clock() - start)))
+    ordered = collections.OrderedDict()
+    hits = [0]
+
+    def memoised(key):
+        value = ordered.pop(key, _MISS)
+        if value is _MISS:
+            value = key * 2
+            if len(ordered) >= capacity:
+                ordered.popitem(last=False)
+        else:
+            hits[0] += 1
+        ordered[key] = value
+        return value
+    start = clock()
+    for key in keys:
+        memoised(key)
+    rows.append(("OrderedDict", float(hits[0]) / n, n / (clock() - start)))
+    return rows
+
+
+def bench_bloom_filter(n=100000, lookups=100000, seed=0):
+    """Negative lookups with and without a FilteredDict in front of the table.
+
+    Returns (structure, mode, microseconds per missing-key lookup, speedup) rows.
+    """
+    rng = random.Random(seed)
+    keys = [rng.getrandbits(40) for _ in range(n)]
+    misses = [rng.getrandbits(40) | (1 << 40) for _ in range(lookups)]
+    rows = []
+    for name, table in (("OpenAddressHashDict", OpenAddressHashDict.from_items((key, key) for key in keys)),
+                        ("BinarySearchTreeDict",
+                         BinarySearchTreeDict.from_sorted((key, key) for key in sorted(set(keys))))):
+        baseline = None
+        for mode, front in (("plain", table), ("bloom 1%", FilteredDict(table))):
+            start = clock()
+            for key in misses:
+                key in front
+            elapsed = 1e6 * (clock() - start) / lookups
+            baseline = baseline or elapsed
+            rows.append((name, mode, elapsed, baseline / elapsed))
+    return rows
+
+
+def bench_ordered_maps(sizes=(10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7), fanout=1000, seed=0):
+    """Compact AVL BinarySearchTreeDict against SortedBlockDict on random keys.
+
+    Returns (structure, n, bytes per key, insert seconds, lookup seconds,
+    full scan seconds, seconds for 100 range scans of 1% of the keys) rows.
+    Container bytes exclude the keys and values themselves but include the
+    tree's (key, value) tuples and the block lists' spare capacity.
+    """
+    rows = []
+    for n in sizes:
+        rng = random.Random(seed)
+        keys = [rng.getrandbits(48) for _ in range(n)]
+        ordered = sorted(keys)
+        starts = [rng.randrange(n) for _ in range(100)]
+        for name, table, measure in (
+                ("BinarySearchTreeDict", BinarySearchTreeDict(balanced=True, compact=True),
+                 lambda tree: tree_bytes(tree) + sum(sys.getsizeof(item) for item in tree.items())),
+                ("SortedBlockDict", SortedBlockDict(fanout=fanout), sorted_block_bytes)):
+            start = clock()
+            for key in keys:
+                table[key] = key
+            inserted = clock() - start
+            start = clock()
+            for key in keys:
+                table[key]
+            looked_up = clock() - start
+            start = clock()
+            for _ in table.items():
+                pass
+            scanned = clock() - start
+            start = clock()
+            for index in starts:
+                for _ in table.range(ordered[index], ordered[min(index + n // 100, n - 1)]):
+                    pass
+            ranged = clock() - start
+            rows.append((name, n, float(measure(table)) / n, inserted, looked_up, scanned, ranged))
+    return rows
+
+
+def bench_skip_list(n=5000, seed=0):
+    """SkipListDict next to unbalanced and AVL BinarySearchTreeDict on sorted and random inserts.
+
+    Returns (stream, structure, insert seconds, lookup seconds, range scan
+    seconds) rows.
+    """
+    rows = []
+    for kind in ("sorted", "random"):
+        keys = key_stream(kind, n, seed)
+        for name, factory in (("bst unbalanced", BinarySearchTreeDict),
+                              ("bst avl", lambda: BinarySearchTreeDict(balanced=True)),
+                              ("skip list p=0.5", lambda: SkipListDict(seed=seed)),
+                              ("skip list p=0.25", lambda: SkipListDict(probability=0.25, seed=seed))):
+            table = factory()
+            start = clock()
+            for key in keys:
+                table[key] = key
+            inserted = clock() - start
+            start = clock()
+            for key in keys:
+                table[key]
+            looked_up = clock() - start
+            start = clock()
+            for lo in range(0, n, max(n // 100, 1)):
+                for _ in table.range(lo, lo + n // 100):
+                    pass
+            rows.append((kind, name, inserted, looked_up, clock() - start))
+    return rows
+
+
+def make_keys(distribution, n, seed=0):
+    """
+    Keys to insert and keys known to be missing for a distribution.
+
+    >>> make_keys("sequential", 3)
+    ([0, 1, 2], [3, 4, 5])
+    >>> hits, misses = make_keys("random", 100)
+    >>> len(set(hits) | set(misses))
+    200
+    """
+    if distribution == "sequential":
+        keys = key_stream("sorted", 2 * n)
+    else:
+        keys = random.Random(seed).sample(xrange(1 << 40), 2 * n)
+    return keys[:n], keys[n:]
+
+
+def is_quadratic(structure, distribution):
+    """
+    Cases whose total cost grows with n ** 2 and are capped in size.
+
+    >>> is_quadratic("ChainedHashDict", "terrible_hash"), is_quadratic("dict", "terrible_hash")
+    (True, False)
+    >>> is_quadratic("BinarySearchTreeDict", "sequential"), is_quadratic("SinglyLinkedList", "random")
+    (True, True)
+    """
+    if structure == "SinglyLinkedList":
+        return True
+    if structure == "BinarySearchTreeDict":
+        return distribution == "sequential"
+    return distribution == "terrible_hash" and structure != "dict"
+
+
+def make_structure(structure, distribution, stats=None):
+    hashfunc = terrible_hash(7) if distribution == "terrible_hash" else hash
+    if structure == "dict":
+        return {}
+    if structure == "SinglyLinkedList":
+        return SinglyLinkedList()
+    if structure == "ChainedHashDict":
+        return ChainedHashDict(hashfunc=hashfunc, stats=stats)
+    if structure == "OpenAddressHashDict":
+        return OpenAddressHashDict(hashfunc=hashfunc, stats=stats)
+    return BinarySearchTreeDict()
+
+
+def run_once(structure, distribution, n, sample, seed):
+    keys, misses = make_keys(distribution, n, seed)
+    probes = random.Random(seed + 1).sample(keys, min(sample, n))
+    misses = misses[:len(probes)]
+    table = make_structure(structure, distribution)
+    timings = {}
+    if structure == "SinglyLinkedList":
+        insert, lookup, delete = table.append, table.__contains__, table.remove
+        iterate = table.__iter__
+    else:
+        insert = table.__setitem__
+        lookup = table.__getitem__ if structure != "dict" else table.get
+        delete = table.__delitem__
+        iterate = table.iteritems if structure == "dict" else table.items
+
+    start = clock()
+    if structure == "SinglyLinkedList":
+        for key in keys:
+            insert(key)
+    else:
+        for key in keys:
+            insert(key, key)
+    timings["insert"] = (clock() - start, n)
+    start = clock()
+    for key in probes:
+        lookup(key)
+    timings["lookup_hit"] = (clock() - start, len(probes))
+    start = clock()
+    for key in misses:
+        lookup(key)
+    timings["lookup_miss"] = (clock() - start, len(misses))
+    start = clock()
+    for _ in iterate():
+        pass
+    timings["iterate"] = (clock() - start, n)
+    start = clock()
+    for key in probes:
+        delete(key)
+    timings["delete"] = (clock() - start, len(probes))
+    if structure.endswith("HashDict"):
+        # Rebuilds are timed in a separate instrumented pass so recording
+        # stats does not slow down the operations timed above.
+        stats = HashTableStats()
+        table = make_structure(structure, distribution, stats)
+        for key in keys:
+            table[key] = key
+        timings["resize"] = (stats.rebuild_seconds, max(stats.rebuilds, 1))
+    return timings
+
+
+def run_case(structure, distribution, n, repeat=3, sample=1000, seed=0):
+    """
+    Best-of-`repeat` timings for one structure, distribution and size, as
+    result records with microseconds per operation.
+
+    >>> records = run_case("ChainedHashDict", "random", 100, repeat=1, sample=10)
+    >>> sorted(record["operation"] for record in records)
+    ['delete', 'insert', 'iterate', 'lookup_hit', 'lookup_miss', 'resize']
+    >>> records[0]["structure"], records[0]["n"]
+    ('ChainedHashDict', 100)
+    """
+    best = {}
+    for _ in range(repeat):
+        for operation, (seconds, count) in run_once(structure, distribution, n, sample, seed).items():
+            if operation not in best or seconds < best[operation][0]:
+                best[operation] = (seconds, count)
+    return [{"structure": structure, "distribution": distribution, "n": n, "operation": operation,
+             "count": count, "us_per_op": 1e6 * seconds / count}
+            for operation, (seconds, count) in sorted(best.items())]
+
+
+def run_suite(sizes=(1000, 10000, 100000), structures=STRUCTURES, distributions=DISTRIBUTIONS, repeat=3,
+              sample=1000, seed=0, quadratic_cap=5000, progress=None):
+    """Run every case and return a JSON-serialisable report."""
+    results = []
+    for distribution in distributions:
+        for structure in structures:
+            for n in sizes:
+                if n > quadratic_cap and is_quadratic(structure, distribution):
+                    continue
+                if progress is not None:
+                    progress(structure, distribution, n)
+                results.extend(run_case(structure, distribution, n, repeat, sample, seed))
+    return {
+        "meta": {
+            "python": platform.python_version(),
+            "implementation": platform.python_implementation(),
+            "platform": platform.platform(),
+            "sizes": list(sizes),
+            "repeat": repeat,
+            "sample": sample,
+            "seed": seed,
+            "quadratic_cap": quadratic_cap,
+        },
+        "results": results,
+    }
+
+
+def compare(baseline, current, threshold=1.1):
+    """
+    Match up results from two reports; returns (case, baseline us, current
+    us, ratio) rows for cases at least `threshold` times slower.
+
+    >>> old = {"results": [{"structure": "dict", "distribution": "random", "n": 10,
+    ...                     "operation": "insert", "us_per_op": 1.0}]}
+    >>> new = {"results": [{"structure": "dict", "distribution": "random", "n": 10,
+    ...                     "operation": "insert", "us_per_op": 1.5}]}
+    >>> compare(old, new)
+    [('dict/random/10/insert', 1.0, 1.5, 1.5)]
+    >>> compare(new, old)
+    []
+    """
+    def case(record):
+        return "%s/%s/%d/%s" % (record["structure"], record["distribution"], record["n"], record["operation"])
+    before = dict((case(record), record["us_per_op"]) for record in baseline["results"])
+    rows = []
+    for record in current["results"]:
+        name = case(record)
+        if name in before and before[name] > 0:
+            ratio = record["us_per_op"] / before[name]
+            if ratio >= threshold:
+                rows.append((name, before[name], record["us_per_op"], ratio))
+    return rows
+
+
+def print_report(report):
+    print "%-22s %-14s %8s %-12s %12s" % ("structure", "distribution", "n", "operation", "us/op")
+    for record in report["results"]:
+        print "%-22s %-14s %8d %-12s %12.3f" % (record["structure"], record["distribution"], record["n"],
+                                                 record["operation"], record["us_per_op"])
+
+
+def print_tables(n=100000):
+    print "---------------Node memory (n = %d)---------------" % n
+    print "%-22s %-8s %12s %10s %9s %9s" % ("structure", "mode", "bytes", "bytes/key", "build s", "walk s")
+    for row in bench_node_memory(n):
+        print "%-22s %-8s %12d %10.1f %9.3f %9.3f" % row
+    print "---------------Typed table memory (n = %d)---------------" % n
+    print "%-25s %12s %10s %9s %9s" % ("structure", "bytes", "bytes/key", "build s", "lookup s")
+    for row in bench_typed_memory(n):
+        print "%-25s %12d %10.1f %9.3f %9.3f" % row
+    print "---------------ChainedHashDict insert latency (n = %d)---------------" % n
+    print "%-15s %10s %10s %10s %12s" % ("mode", "p50 us", "p99 us", "p99.9 us", "max us")
+    for row in bench_insert_latency(n):
+        print "%-15s %10.2f %10.2f %10.2f %12.2f" % row
+    print "---------------OpenAddressHashDict churn (n = %d)---------------" % n
+    print "%-11s %6s %10s %9s %11s %10s" % ("mode", "round", "mean disp", "max disp", "tombstones", "miss us")
+    for row in bench_probe_churn(n):
+        print "%-11s %6d %10.2f %9d %11d %10.2f" % row
+    print "---------------Shared hash dict throughput (n = %d)---------------" % n
+    print "%-12s %8s %9s %12s" % ("mode", "threads", "seconds", "ops/s")
+    for row in bench_concurrent(n):
+        print "%-12s %8d %9.3f %12.0f" % row
+    print "---------------Process-sharded bulk load (n = %d)---------------" % n
+    print "%-11s %10s %9s %9s" % ("mode", "processes", "load s", "lookup s")
+    for row in bench_process_shards(n):
+        print "%-11s %10d %9.3f %9.3f" % row
+    print "---------------Snapshots (n = %d)---------------" % n
+    print "%-22s %-9s %12s %9s %9s" % ("structure", "format", "bytes", "dump s", "load s")
+    for row in bench_snapshots(n):
+        print "%-22s %-9s %12d %9.3f %9.3f" % row
+    print "---------------Batch lookups (n = %d)---------------" % n
+    print "%-25s %-15s %12s" % ("structure", "mode", "lookups/s")
+    for row in bench_batch_lookup(n):
+        print "%-25s %-15s %12.0f" % row
+    print "---------------LRU cache, Zipfian keys (n = %d)---------------" % n
+    print "%-20s %10s %12s" % ("cache", "hit ratio", "calls/s")
+    for row in bench_lru_cache(n):
+        print "%-20s %10.3f %12.0f" % row
+    print "---------------Bloom-filtered misses (n = %d)---------------" % n
+    print "%-22s %-9s %9s %8s" % ("structure", "mode", "miss us", "speedup")
+    for row in bench_bloom_filter(n):
+        print "%-22s %-9s %9.2f %8.2f" % row
+    print "---------------Ordered maps (up to n = %d)---------------" % n
+    print "%-22s %9s %9s %9s %9s %9s %9s" % ("structure", "n", "bytes/key", "insert s", "lookup s", "scan s",
+                                             "range s")
+    for row in bench_ordered_maps([size for size in (10 ** 4, 10 ** 5, 10 ** 6, 10 ** 7) if size <= n]):
+        print "%-22s %9d %9.1f %9.3f %9.3f %9.3f %9.3f" % row
+    tree_n = min(n, 5000)
+    print "---------------BinarySearchTreeDict key streams (n = %d)---------------" % tree_n
+    print "%-8s %-11s %7s %10s %10s" % ("stream", "mode", "height", "insert s", "lookup s")
+    for row in bench_tree_streams(tree_n):
+        print "%-8s %-11s %7d %10.3f %10.3f" % row
+    print "---------------Skip list vs BST (n = %d)---------------" % tree_n
+    print "%-8s %-17s %10s %10s %10s" % ("stream", "structure", "insert s", "lookup s", "range s")
+    for row in bench_skip_list(tree_n):
+        print "%-8s %-17s %10.3f %10.3f %10.3f" % row
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the DataStructures module.")
+    parser.add_argument("n", nargs="?", type=int, default=100000, help="entries per benchmark table")
+    parser.add_argument("--suite", action="store_true", help="run the reproducible cases instead of the tables")
+    parser.add_argument("--sizes", default="1000,10000,100000")
+    parser.add_argument("--structures", default=",".join(STRUCTURES))
+    parser.add_argument("--distributions", default=",".join(DISTRIBUTIONS))
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--sample", type=int, default=1000, help="keys per lookup/delete phase")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--quadratic-cap", type=int, default=5000,
+                        help="largest n for cases that are O(n ** 2) overall")
+    parser.add_argument("--output", help="write the JSON report here")
+    parser.add_argument("--compare", help="baseline JSON report to check for regressions")
+    parser.add_argument("--threshold", type=float, default=1.1)
+    args = parser.parse_args(argv)
+    if not args.suite:
+        print_tables(args.n)
+        return 0
+
+    def progress(structure, distribution, n):
+        sys.stderr.write("%s %s n=%d\n" % (structure, distribution, n))
+    report = run_suite([int(size) for size in args.sizes.split(",")], args.structures.split(","),
+                       args.distributions.split(","), args.repeat, args.sample, args.seed,
+                       args.quadratic_cap, progress)
+    print_report(report)
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2, sort_keys=True)
+    if args.compare:
+        with open(args.compare) as baseline_file:
+            regressions = compare(json.load(baseline_file), report, args.threshold)
+        print "---------------Regressions (>= %.2fx slower)---------------" % args.threshold
+        for row in regressions:
+            print "%-55s %10.3f %10.3f %6.2fx" % row
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())